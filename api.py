@@ -1,23 +1,66 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
 from multi_agent_wrapper import build_multi_agent_graph
 from transcript_analyzer import (
     extract_metadata_from_transcript,
-    extract_tasks_from_transcript,
-    save_tasks_to_csv
+    stream_tasks_from_transcript,
+    extract_all_from_transcript,
+    aextract_from_transcript,
+    aextract_metadata_from_transcript,
+    astream_tasks_from_transcript,
+    save_tasks_to_csv,
+    approval_csv_path
 )
 from jira_integration import (
-    update_jira_from_csv,
+    sync_tasks_to_jira,
     delete_task_from_jira,
     fetch_task_from_jira
 )
-from memory_manager import load_memory, save_memory
+from memory_manager import (
+    load_memory,
+    aload_memory,
+    update_memory,
+    list_projects,
+    load_memory_at,
+    get_events,
+    archive_cold_data,
+    find_archived,
+    get_upcoming_tasks,
+    get_overdue_tasks,
+    assign_task_ids,
+    allocate_task_ids,
+    TaskIdAssigner,
+    PROJECT_ID,
+    aadd_task,
+    aupdate_task,
+    aupsert_tasks,
+    get_task,
+    delete_task,
+    start_cache_invalidation_listener
+)
 from chatbot import query_llm
+from llm_metrics import get_llm_stats, reset_llm_stats
+from llm_cache import cache_info, clear_cache
+from bulk_ingest import ingest_directory, resolve_ingest_directory, INGEST_MAX_CONCURRENCY
+from deadlines import normalize_deadlines, valid_meeting_date
+from event_log import EventLogError
+from jobs import submit_job, get_job, wait_for_change, JobQueueFull, FINISHED
 
 app = FastAPI(title="AI Project Manager")
 
+@app.on_event("startup")
+def start_memory_cache_listener():
+    # With several workers, a change stream keeps every worker's memory cache coherent
+    if os.getenv("MEMORY_CHANGE_STREAM") == "1":
+        start_cache_invalidation_listener()
+
 class Task(BaseModel):
     id: int
     giver: str
@@ -40,15 +83,30 @@ class QuestionRequest(BaseModel):
     question: str
 
 @app.post("/extract-tasks")
-async def api_extract_tasks(request: Request):
+async def api_extract_tasks(request: Request, project_id: str = PROJECT_ID):
     body = await request.json()
     transcript = body.get("transcript", "").strip()
     if not transcript:
         return {"status": "error", "message": "Transcript is empty."}
+    if not valid_meeting_date(body.get("meeting_date")):
+        return {"status": "error", "message": f"Invalid meeting_date '{body.get('meeting_date')}', expected YYYY-MM-DD."}
 
-    memory, metadata_updates = extract_metadata_from_transcript(transcript)
-    tasks = extract_tasks_from_transcript(transcript)
-    save_tasks_to_csv(tasks)
+    # "combined" gets metadata and tasks from one LLM call; "separate" uses two prompts
+    mode = body.get("mode", "separate")
+    if mode not in ("separate", "combined"):
+        return {"status": "error", "message": f"Unknown extraction mode '{mode}'."}
+
+    # LLM and Mongo calls are blocking; keep them off the event loop
+    if mode == "combined":
+        memory, metadata_updates, tasks = await asyncio.to_thread(extract_all_from_transcript, transcript, project_id)
+    else:
+        memory, metadata_updates, tasks = await aextract_from_transcript(transcript, project_id)
+    tasks = await asyncio.to_thread(assign_task_ids, tasks, project_id)
+    # Relative deadlines ("Thursday") resolve against the meeting date, today unless given
+    normalize_deadlines(tasks, body.get("meeting_date"))
+    await asyncio.to_thread(save_tasks_to_csv, tasks, approval_csv_path(project_id))
+    # Keep the hot memory (and the prompts built from it) bounded
+    await asyncio.to_thread(archive_cold_data, project_id)
 
     return {
         "status": "success",
@@ -56,98 +114,202 @@ async def api_extract_tasks(request: Request):
         "tasks": tasks
     }
 
+@app.post("/extract-tasks/stream")
+async def api_extract_tasks_stream(request: Request, project_id: str = PROJECT_ID):
+    """Like /extract-tasks, but streams newline-delimited JSON events.
+
+    A {"type": "task"} event is sent for each task as soon as the LLM has written
+    it, then one {"type": "done"} event with the metadata updates and the final
+    task list (later chunks may have filled in fields of tasks already sent).
+    """
+    body = await request.json()
+    transcript = body.get("transcript", "").strip()
+    if not transcript:
+        return {"status": "error", "message": "Transcript is empty."}
+    if not valid_meeting_date(body.get("meeting_date")):
+        return {"status": "error", "message": f"Invalid meeting_date '{body.get('meeting_date')}', expected YYYY-MM-DD."}
+
+    async def events():
+        metadata_job = asyncio.create_task(aextract_metadata_from_transcript(transcript, project_id))
+        tasks = []
+        try:
+            assigner = await asyncio.to_thread(TaskIdAssigner, project_id)
+            async for task in astream_tasks_from_transcript(transcript, project_id):
+                await asyncio.to_thread(assigner.assign, [task])
+                normalize_deadlines([task], body.get("meeting_date"))
+                tasks.append(task)
+                yield json.dumps({"type": "task", "task": task}) + "\n"
+            memory, metadata_updates = await metadata_job
+        except Exception as e:
+            metadata_job.cancel()
+            print(f"Streaming extraction failed: {e}")
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+            return
+        await asyncio.to_thread(save_tasks_to_csv, tasks, approval_csv_path(project_id))
+        await asyncio.to_thread(archive_cold_data, project_id)
+        yield json.dumps({"type": "done", "metadata_updates": metadata_updates, "tasks": tasks}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _extraction_job(report, transcript, project_id, mode, meeting_date=None):
+    """Worker-side extraction; reports the current stage and how many tasks were found so far."""
+    if mode == "combined":
+        report(stage="extracting")
+        memory, metadata_updates, tasks = extract_all_from_transcript(transcript, project_id)
+    else:
+        report(stage="extracting", tasks_found=0)
+        tasks = []
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            metadata_job = pool.submit(extract_metadata_from_transcript, transcript, project_id)
+            for task in stream_tasks_from_transcript(transcript, project_id):
+                tasks.append(task)
+                report(tasks_found=len(tasks))
+            report(stage="merging metadata")
+            memory, metadata_updates = metadata_job.result()
+    report(stage="saving")
+    assign_task_ids(tasks, project_id)
+    normalize_deadlines(tasks, meeting_date)
+    save_tasks_to_csv(tasks, approval_csv_path(project_id))
+    archive_cold_data(project_id)
+    report(stage="finished")
+    return {"metadata_updates": metadata_updates, "tasks": tasks}
+
+@app.post("/jobs/extract-tasks")
+async def api_submit_extraction(request: Request, project_id: str = PROJECT_ID):
+    """Queue an extraction on the worker pool and return its job id straight away."""
+    body = await request.json()
+    transcript = body.get("transcript", "").strip()
+    if not transcript:
+        return {"status": "error", "message": "Transcript is empty."}
+    if not valid_meeting_date(body.get("meeting_date")):
+        return {"status": "error", "message": f"Invalid meeting_date '{body.get('meeting_date')}', expected YYYY-MM-DD."}
+    mode = body.get("mode", "separate")
+    if mode not in ("separate", "combined"):
+        return {"status": "error", "message": f"Unknown extraction mode '{mode}'."}
+
+    try:
+        job_id = submit_job("extract-tasks", _extraction_job, transcript, project_id, mode, body.get("meeting_date"))
+    except JobQueueFull:
+        return {"status": "error", "message": "Too many extractions queued, try again shortly."}
+    return {"status": "success", "job_id": job_id}
+
+@app.post("/jobs/ingest")
+async def api_submit_ingest(request: Request, project_id: str = PROJECT_ID):
+    """Queue a bulk ingestion of every .txt transcript in a server-side directory."""
+    body = await request.json()
+    directory = resolve_ingest_directory(str(body.get("directory", "")))
+    if directory is None:
+        return {"status": "error", "message": f"Directory '{body.get('directory', '')}' not found under the ingest root."}
+    concurrency = body.get("concurrency")
+    if concurrency is not None and (type(concurrency) is not int or not 1 <= concurrency <= INGEST_MAX_CONCURRENCY):
+        return {"status": "error", "message": f"concurrency must be an integer from 1 to {INGEST_MAX_CONCURRENCY}."}
+
+    def run(report, directory, project_id, concurrency):
+        return ingest_directory(directory, project_id, concurrency, report=report)
+
+    try:
+        job_id = submit_job("ingest", run, directory, project_id, concurrency)
+    except JobQueueFull:
+        return {"status": "error", "message": "Too many jobs queued, try again shortly."}
+    return {"status": "success", "job_id": job_id}
+
+@app.get("/jobs/{job_id}")
+def api_get_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        return {"status": "error", "message": f"No job found with ID {job_id}"}
+    return {"status": "success", "job": job}
+
+@app.get("/jobs/{job_id}/events")
+async def api_job_events(job_id: str):
+    """Server-sent events: one event per job change, ending when the job finishes."""
+    async def events():
+        revision = None
+        while True:
+            job = await asyncio.to_thread(wait_for_change, job_id, revision, 15)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'message': f'No job found with ID {job_id}'})}\n\n"
+                return
+            if job["revision"] == revision:
+                # Keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            revision = job["revision"]
+            yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in FINISHED:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.post("/add-task")
-async def api_add_task(request: Request):
+async def api_add_task(request: Request, project_id: str = PROJECT_ID):
     task = await request.json()
-    memory = load_memory()
 
-    if "tasks" not in memory:
-        memory["tasks"] = []
-
-    # Avoid duplicate IDs
-    if any(t["id"] == task["id"] for t in memory["tasks"]):
+    # Avoid duplicate IDs (enforced by the unique index on task id)
+    if not await aadd_task(task, project_id):
         return {"status": "error", "message": f"Task with ID {task['id']} already exists."}
 
-    memory["tasks"].append(task)
-    memory["metadata"]["updated_at"] = datetime.utcnow().isoformat()
-    save_memory(memory)
-
     return {"status": "success", "message": "Task added to memory successfully."}
 
 @app.post("/update-task")
-async def api_update_task(request: Request):
+async def api_update_task(request: Request, project_id: str = PROJECT_ID):
     updated_task = await request.json()
-    memory = load_memory()
 
-    updated = False
-    for t in memory.get("tasks", []):
-        if t["id"] == updated_task["id"]:
-            t.update(updated_task)
-            updated = True
-            break
-
-    if not updated:
+    if not await aupdate_task(updated_task, project_id):
         return {"status": "error", "message": f"No task found with ID {updated_task['id']}"}
 
-    memory["metadata"]["updated_at"] = datetime.utcnow().isoformat()
-    save_memory(memory)
-
     return {"status": "success", "message": "Task updated in memory successfully."}
 
 
 @app.post("/save-tasks")
-async def api_save_tasks(request: Request):
+async def api_save_tasks(request: Request, project_id: str = PROJECT_ID):
     data = await request.json()
     tasks = data if isinstance(data, list) else data.get("tasks", [])
-    csv_filename = "approval.csv"
-    save_tasks_to_csv(tasks, filename=csv_filename)
+    # Rows added by hand arrive without an id; number them from the shared sequence
+    unnumbered = [t for t in tasks if t.get("id") in (None, "")]
+    if unnumbered:
+        first = await asyncio.to_thread(allocate_task_ids, len(unnumbered))
+        for offset, task in enumerate(unnumbered):
+            task["id"] = first + offset
+    await asyncio.to_thread(save_tasks_to_csv, tasks, approval_csv_path(project_id))
 
-    jira_results = update_jira_from_csv(csv_filename)
+    # Synced from this request's own task list, never from a file another request may rewrite
+    jira_results = await asyncio.to_thread(sync_tasks_to_jira, tasks)
 
-    memory = load_memory()
-    if "tasks" not in memory:
-        memory["tasks"] = []
-
-    existing_ids = {t["id"] for t in memory["tasks"]}
-    for task in tasks:
-        if task["id"] not in existing_ids:
-            memory["tasks"].append(task)
-        else:
-            for mt in memory["tasks"]:
-                if mt["id"] == task["id"]:
-                    mt.update(task)
-
-    memory["metadata"]["updated_at"] = datetime.utcnow().isoformat()
-    save_memory(memory)
+    await aupsert_tasks(tasks, project_id)
 
     return {
         "status": "success",
         "message": "Jira and memory both updated successfully!",
-        "jira_results": jira_results
+        "jira_results": jira_results,
+        "tasks": tasks
     }
 
 @app.delete("/delete-task/{task_id}")
-def api_delete_task(task_id: int):
+def api_delete_task(task_id: int, project_id: str = PROJECT_ID):
+    # Jira issues are labelled by task id alone, so only touch one this project owns
+    if get_task(task_id, project_id) is None:
+        return {"status": "error", "message": f"No task with ID {task_id} in project {project_id}"}
+
     # Delete from Jira
     result = delete_task_from_jira(task_id)
 
-    memory = load_memory()
-    tasks_before = len(memory.get("tasks", []))
-    memory["tasks"] = [t for t in memory.get("tasks", []) if t["id"] != task_id]
-    tasks_after = len(memory["tasks"])
-
-    if tasks_before != tasks_after:
-        memory["metadata"]["updated_at"] = datetime.utcnow().isoformat()
-        save_memory(memory)
+    memory_deleted = delete_task(task_id, project_id)
 
     return {
         "status": "success",
         "message": f"{result}. Memory synced successfully.",
-        "memory_deleted": tasks_before - tasks_after
+        "memory_deleted": memory_deleted
     }
 
+@app.get("/projects")
+def api_list_projects():
+    return {"status": "success", "projects": list_projects()}
+
 @app.get("/get-task/{task_id}")
-def api_get_task(task_id: int):
+def api_get_task(task_id: int, project_id: str = PROJECT_ID):
+    if get_task(task_id, project_id) is None:
+        return {"status": "error", "message": f"No task with ID {task_id} in project {project_id}"}
     task = fetch_task_from_jira(task_id)
     if task:
         return {"status": "success", "task": task}
@@ -155,29 +317,30 @@ def api_get_task(task_id: int):
         return {"status": "error", "message": f"No task found with ID {task_id}"}
     
 @app.get("/get-project-name")
-def get_project_name():
-    memory = load_memory()
+def get_project_name(project_id: str = PROJECT_ID):
+    memory = load_memory(project_id, fields=["project_name"])
     project_name = memory.get("project_name", "Unnamed Project")
     return {"project_name": project_name}
 
 @app.post("/update-project-name")
-def update_project_name(payload: dict):
+def update_project_name(payload: dict, project_id: str = PROJECT_ID):
     new_name = payload.get("project_name")
     if not new_name:
         return {"status": "error", "message": "Project name cannot be empty."}
 
-    memory = load_memory()
-    memory["project_name"] = new_name
-    save_memory(memory)
+    def rename(memory):
+        memory["project_name"] = new_name
+
+    update_memory(rename, project_id)
     return {"status": "success", "message": f"Project name updated to '{new_name}'"}
 
 @app.get("/get-project-details")
-def get_project_details():
+def get_project_details(project_id: str = PROJECT_ID):
     """
     Fetch detailed project information from memory including:
     description, start_date, expected_end_date, and notes.
     """
-    memory = load_memory()
+    memory = load_memory(project_id, fields=["project_info"])
     project_info = memory.get("project_info",{})
     if not project_info:
         return {"status": "error", "message": "No project information found."}
@@ -187,48 +350,106 @@ def get_project_details():
     }
 
 @app.post("/update-project-info")
-def update_project_info(info: ProjectInfoUpdate):
-    memory = load_memory()
-    if "project_info" not in memory:
-        memory["project_info"] = {}
+def update_project_info(info: ProjectInfoUpdate, project_id: str = PROJECT_ID):
+    def apply_info(memory):
+        if "project_info" not in memory:
+            memory["project_info"] = {}
 
-    memory["project_info"]["description"] = info.description
-    memory["project_info"]["start_date"] = info.start_date
-    memory["project_info"]["expected_end_date"] = info.expected_end_date
-    memory["project_info"]["updated_at"] = datetime.utcnow().isoformat()
+        memory["project_info"]["description"] = info.description
+        memory["project_info"]["start_date"] = info.start_date
+        memory["project_info"]["expected_end_date"] = info.expected_end_date
+        memory["project_info"]["updated_at"] = datetime.utcnow().isoformat()
 
-    save_memory(memory)
+    update_memory(apply_info, project_id)
     return {"status": "success", "message": "Project information updated successfully."}
 
 @app.post("/update-project-notes")
-def update_project_notes(notes_update: NotesUpdate):
-    memory = load_memory()
-    if "project_info" not in memory:
-        memory["project_info"] = {}
+def update_project_notes(notes_update: NotesUpdate, project_id: str = PROJECT_ID):
+    def apply_notes(memory):
+        if "project_info" not in memory:
+            memory["project_info"] = {}
 
-    memory["project_info"]["notes"] = notes_update.notes
-    memory["project_info"]["updated_at"] = datetime.utcnow().isoformat()
+        memory["project_info"]["notes"] = notes_update.notes
+        memory["project_info"]["updated_at"] = datetime.utcnow().isoformat()
 
-    save_memory(memory)
+    update_memory(apply_notes, project_id)
     return {"status": "success", "message": "Notes updated successfully."}
 
 @app.get("/get-project-details")
-def get_project_details():
-    memory = load_memory()
+def get_project_details(project_id: str = PROJECT_ID):
+    memory = load_memory(project_id, fields=["project_info"])
     project_info = memory.get("project_info", {})
     return {"status": "success", "project_info": project_info}
 
 @app.get("/get-task-analysis")
-def get_task_analysis():
-    memory = load_memory()
+def get_task_analysis(project_id: str = PROJECT_ID):
+    memory = load_memory(project_id, fields=["tasks", "metadata"])
     return {"tasks": memory["tasks"], "metadata": memory["metadata"]}
 
+@app.get("/tasks/upcoming")
+def api_upcoming_tasks(project_id: str = PROJECT_ID, days: Optional[int] = None):
+    """Open tasks due from today on (within `days`), ordered by resolved deadline."""
+    return {"status": "success", "tasks": get_upcoming_tasks(project_id, days)}
+
+@app.get("/tasks/overdue")
+def api_overdue_tasks(project_id: str = PROJECT_ID):
+    return {"status": "success", "tasks": get_overdue_tasks(project_id)}
+
+@app.get("/project-history")
+def get_project_history(project_id: str = PROJECT_ID, version: Optional[int] = None, at: Optional[str] = None):
+    """Point-in-time view of project memory, by version or ISO timestamp."""
+    try:
+        memory = load_memory_at(project_id, version=version, at=at)
+    except EventLogError as e:
+        return {"status": "error", "message": str(e)}
+    if memory is None:
+        return {"status": "error", "message": "No history recorded for that point in time."}
+    return {"status": "success", "memory": memory}
+
+@app.get("/project-events")
+def get_project_events(project_id: str = PROJECT_ID, after_version: Optional[int] = None):
+    return {"status": "success", "events": get_events(project_id, after_version=after_version)}
+
+@app.post("/archive/run")
+def run_archival(project_id: str = PROJECT_ID):
+    result = archive_cold_data(project_id)
+    return {"status": "success", **result}
+
+@app.get("/archive/tasks")
+def get_archived_tasks(project_id: str = PROJECT_ID, assignee: Optional[str] = None, limit: int = 100, skip: int = 0):
+    query = {"assignee": assignee} if assignee else None
+    return {"status": "success", "tasks": find_archived(project_id, "task", query, limit, skip)}
+
+@app.get("/archive/notes")
+def get_archived_notes(project_id: str = PROJECT_ID, limit: int = 100, skip: int = 0):
+    notes = [item["text"] for item in find_archived(project_id, "note", None, limit, skip)]
+    return {"status": "success", "notes": notes}
+
 @app.post("/ask-question")
-async def ask_question(req: QuestionRequest):
-    memory = load_memory()
-    response = query_llm(memory, req.question)
+async def ask_question(req: QuestionRequest, project_id: str = PROJECT_ID):
+    memory = await aload_memory(project_id)
+    response = await asyncio.to_thread(query_llm, memory, req.question)
     return {"answer": response}
 
+@app.get("/llm-stats")
+def api_llm_stats():
+    """Per call-site LLM token counts, latency by stage and failures since startup (or the last reset)."""
+    return {"status": "success", "stats": get_llm_stats()}
+
+@app.post("/llm-stats/reset")
+def api_reset_llm_stats():
+    reset_llm_stats()
+    return {"status": "success", "message": "LLM stats reset."}
+
+@app.get("/llm-cache")
+def api_llm_cache():
+    return {"status": "success", "cache": cache_info()}
+
+@app.delete("/llm-cache")
+def api_clear_llm_cache():
+    clear_cache()
+    return {"status": "success", "message": "LLM response cache cleared."}
+
 """@app.post("/run-multi-agent")
 async def run_multi_agent(request: Request):
     data = await request.json()
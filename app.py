@@ -1,18 +1,31 @@
 import streamlit as st
 import pandas as pd
 import requests
+import json
+import time
 from datetime import datetime
 import matplotlib.pyplot as plt
 
 BACKEND_URL = "http://127.0.0.1:8000"
+# Calls that wait on the LLM or Jira get a longer timeout than plain memory reads
+SLOW_REQUEST_TIMEOUT = 120
+EXTRACTION_POLL_SECONDS = 1
 
+project_id = st.sidebar.text_input("Project ID", value="project_ai_pm").strip() or "project_ai_pm"
+project_params = {"project_id": project_id}
+
+# Drop cached project data when switching projects
+if st.session_state.get("active_project_id") != project_id:
+    for key in ("project_name", "project_data", "df"):
+        st.session_state.pop(key, None)
+    st.session_state.active_project_id = project_id
 
 page = st.sidebar.radio("Navigate", ["AutoPM", "Project Details"])
 
 if page == "Project Details":
     
     try:
-        resp = requests.get(f"{BACKEND_URL}/get-project-details", timeout=5)
+        resp = requests.get(f"{BACKEND_URL}/get-project-details", params=project_params, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             if data.get("status") == "success":
@@ -26,12 +39,12 @@ if page == "Project Details":
 
     if "project_name" not in st.session_state:
         try:
-            resp = requests.get(f"{BACKEND_URL}/get-project-name", timeout=5)
+            resp = requests.get(f"{BACKEND_URL}/get-project-name", params=project_params, timeout=5)
             st.session_state.project_name = resp.json().get("project_name", "Unnamed Project") if resp.status_code == 200 else "Unnamed Project"
         except Exception:
             st.session_state.project_name = "Unnamed Project"
     try:
-        resp = requests.get(f"{BACKEND_URL}/get-project-name", timeout=5)
+        resp = requests.get(f"{BACKEND_URL}/get-project-name", params=project_params, timeout=5)
         project_name = resp.json().get("project_name", "Unnamed Project") if resp.status_code == 200 else "Unnamed Project"
     except Exception:
         project_name = "Unnamed Project"
@@ -49,7 +62,7 @@ if page == "Project Details":
         new_name = st.text_input("Enter new project name", value=st.session_state.project_name)
         if st.button("💾 Save Name", key="save_project_name_btn"):
             try:
-                resp = requests.post(f"{BACKEND_URL}/update-project-name", json={"project_name": new_name}, timeout=5)
+                resp = requests.post(f"{BACKEND_URL}/update-project-name", params=project_params, json={"project_name": new_name}, timeout=5)
                 data = resp.json()
                 if resp.status_code == 200 and data.get("status") == "success":
                     st.session_state.project_name = new_name
@@ -82,7 +95,7 @@ if page == "Project Details":
         # Fetch data from backend only once
         if st.session_state.show_project_info and st.session_state.project_data["description"] == "":
             try:
-                resp = requests.get(f"{BACKEND_URL}/get-project-details")
+                resp = requests.get(f"{BACKEND_URL}/get-project-details", params=project_params, timeout=5)
                 if resp.status_code == 200:
                     data = resp.json()
                     if data.get("status") == "success":
@@ -131,6 +144,7 @@ if page == "Project Details":
                     try:
                         resp = requests.post(
                             f"{BACKEND_URL}/update-project-info",
+                            params=project_params,
                             json=payload,
                             timeout=5
                         )
@@ -166,6 +180,7 @@ if page == "Project Details":
                     try:
                         resp = requests.post(
                             f"{BACKEND_URL}/update-project-notes",
+                            params=project_params,
                             json={"notes": updated_notes},
                             timeout=5
                         )
@@ -184,7 +199,7 @@ if page == "Project Details":
     st.markdown("---")
     # Fetch tasks for analysis
     try:
-        resp = requests.get(f"{BACKEND_URL}/get-task-analysis")
+        resp = requests.get(f"{BACKEND_URL}/get-task-analysis", params=project_params, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             tasks = pd.DataFrame(data["tasks"])
@@ -196,8 +211,11 @@ if page == "Project Details":
         tasks = pd.DataFrame()
 
     if not tasks.empty:
-        # --- Convert deadline to datetime ---
-        tasks["deadline_dt"] = pd.to_datetime(tasks["deadline"], errors="coerce")
+        # --- Resolved deadline (deadline_date), falling back to parsing the text for older tasks ---
+        resolved = tasks["deadline_date"] if "deadline_date" in tasks else pd.Series(None, index=tasks.index)
+        tasks["deadline_dt"] = pd.to_datetime(resolved, errors="coerce").fillna(
+            pd.to_datetime(tasks["deadline"], errors="coerce")
+        )
 
         # --- Project-Level Analysis ---
         st.subheader("Project-Level Analysis")
@@ -212,15 +230,21 @@ if page == "Project Details":
             for p in ["High", "Medium", "Low"]:
                 st.markdown(f"{p}: {counts.get(p,0)}")
 
-            # Upcoming task
-            upcoming = tasks[tasks["status"] != "Done"].sort_values("deadline_dt").head(1)
-            if not upcoming.empty:
+            # Upcoming and overdue tasks come from the indexed deadline_date range queries
+            try:
+                upcoming = requests.get(f"{BACKEND_URL}/tasks/upcoming", params=project_params, timeout=5).json().get("tasks", [])
+                overdue = requests.get(f"{BACKEND_URL}/tasks/overdue", params=project_params, timeout=5).json().get("tasks", [])
+            except Exception as e:
+                st.error(f"Error fetching deadlines: {e}")
+                upcoming, overdue = [], []
+            if upcoming:
                 st.markdown(
-                    f"**Next Upcoming Task:** {upcoming.iloc[0]['task']} "
-                    f"(Deadline: {upcoming.iloc[0]['deadline']}, Assigned to: {upcoming.iloc[0]['assignee']}, Priority: {upcoming.iloc[0]['priority']})"
+                    f"**Next Upcoming Task:** {upcoming[0]['task']} "
+                    f"(Deadline: {upcoming[0]['deadline']} ({upcoming[0]['deadline_date']}), Assigned to: {upcoming[0]['assignee']}, Priority: {upcoming[0]['priority']})"
                 )
             else:
                 st.markdown("**Next Upcoming Task:** None")
+            st.markdown(f"**Overdue Tasks:** {len(overdue)}")
 
             # Latest completed task
             completed = tasks[tasks["status"] == "Done"].sort_values("deadline_dt", ascending=False)
@@ -279,18 +303,53 @@ elif page == "AutoPM":
     if uploaded_file:
         transcript = uploaded_file.read().decode("utf-8")
 
+        single_pass = st.checkbox("Single-pass extraction (one LLM call)", value=False, key="single_pass_extraction")
         if st.button("Extract Tasks", key="extract_tasks_btn"):
             with st.spinner("Extracting tasks..."):
-                response = requests.post(f"{BACKEND_URL}/extract-tasks", json={"transcript": transcript})
-                if response.status_code == 200:
-                    tasks = response.json().get("tasks", [])
-                    if tasks:
-                        st.session_state.df = pd.DataFrame(tasks)
-                        st.success(f"{len(tasks)} tasks extracted!")
+                tasks, failed = [], False
+                if single_pass:
+                    # Runs as a background job on the backend; poll until it finishes
+                    payload = {"transcript": transcript, "mode": "combined"}
+                    submitted = requests.post(f"{BACKEND_URL}/jobs/extract-tasks", params=project_params, json=payload, timeout=5).json()
+                    job_id = submitted.get("job_id")
+                    failed = job_id is None
+                    deadline = time.time() + SLOW_REQUEST_TIMEOUT
+                    while job_id and time.time() < deadline:
+                        job = requests.get(f"{BACKEND_URL}/jobs/{job_id}", timeout=5).json().get("job") or {}
+                        if job.get("status") == "done":
+                            tasks = job["result"].get("tasks", [])
+                            break
+                        if job.get("status") not in ("queued", "running"):
+                            failed = True
+                            break
+                        time.sleep(EXTRACTION_POLL_SECONDS)
                     else:
-                        st.warning("No tasks found in transcript!")
+                        failed = True
                 else:
+                    # Show tasks as the backend streams them instead of waiting for the whole list
+                    live_table = st.empty()
+                    with requests.post(f"{BACKEND_URL}/extract-tasks/stream", params=project_params, json={"transcript": transcript}, stream=True, timeout=(5, SLOW_REQUEST_TIMEOUT)) as response:
+                        failed = response.status_code != 200
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            event = json.loads(line)
+                            if event.get("type") == "task":
+                                tasks.append(event["task"])
+                                live_table.dataframe(pd.DataFrame(tasks))
+                            elif event.get("type") == "done":
+                                tasks = event.get("tasks", tasks)
+                            else:
+                                failed = True
+                    live_table.empty()
+
+                if failed:
                     st.error("Failed to extract tasks.")
+                elif tasks:
+                    st.session_state.df = pd.DataFrame(tasks)
+                    st.success(f"{len(tasks)} tasks extracted!")
+                else:
+                    st.warning("No tasks found in transcript!")
 
     st.markdown("<hr style='height:5px;border:none;color:#333;background-color:#333;'>", unsafe_allow_html=True)
 
@@ -306,6 +365,7 @@ elif page == "AutoPM":
                     "assignee": "",
                     "task": "",
                     "deadline": "",
+                    "deadline_date": None,
                     "deliverable": "",
                     "priority": "Medium",
                     "status": "In Progress"
@@ -335,7 +395,7 @@ elif page == "AutoPM":
                 for task in tasks_list:
                     if task.get("id") not in [None, ""]:
                         task["id"] = int(float(task["id"]))
-                resp = requests.post(f"{BACKEND_URL}/save-tasks", json=tasks_list)
+                resp = requests.post(f"{BACKEND_URL}/save-tasks", params=project_params, json=tasks_list, timeout=SLOW_REQUEST_TIMEOUT)
                 if resp.status_code == 200:
                     data = resp.json()
                     st.success(data["message"])
@@ -354,10 +414,10 @@ elif page == "AutoPM":
         ])
 
     if st.button("Add Row", key="add_manual_row"):
-        next_id = 1001 if st.session_state.df_manual.empty else int(st.session_state.df_manual["id"].max()) + 1
+        # The backend assigns the id when the row is saved
         st.session_state.df_manual = pd.concat(
             [st.session_state.df_manual, pd.DataFrame([{
-                "id": next_id,
+                "id": "",
                 "giver": "",
                 "assignee": "",
                 "task": "",
@@ -386,18 +446,24 @@ elif page == "AutoPM":
         with col1:
             if st.button("Delete", key="delete_manual_btn"):
                 indices_to_delete = [int(x.split(" - ")[0]) for x in rows_to_delete_manual]
+                # Rows not saved yet have no id and nothing to delete on the backend
+                ids_to_delete = [task_id for task_id in st.session_state.df_manual.loc[indices_to_delete, "id"] if task_id not in (None, "")]
                 st.session_state.df_manual = st.session_state.df_manual.drop(indices_to_delete).reset_index(drop=True)
                 # Also delete from memory via API
-                for idx in indices_to_delete:
-                    task_id = int(st.session_state.df_manual.iloc[idx]["id"])
-                    requests.delete(f"{BACKEND_URL}/delete-task/{task_id}")
+                for task_id in ids_to_delete:
+                    task_id = int(float(task_id))
+                    requests.delete(f"{BACKEND_URL}/delete-task/{task_id}", params=project_params, timeout=SLOW_REQUEST_TIMEOUT)
                 st.success(f"Deleted {len(indices_to_delete)} manual row(s) and memory synced")
         with col2:
             if st.button("Finalize to Jira", key="finalize_manual_btn"):
                 tasks_list = st.session_state.df_manual.to_dict(orient="records")
-                resp = requests.post(f"{BACKEND_URL}/save-tasks", json=tasks_list)
+                for task in tasks_list:
+                    if task.get("id") not in [None, ""]:
+                        task["id"] = int(float(task["id"]))
+                resp = requests.post(f"{BACKEND_URL}/save-tasks", params=project_params, json=tasks_list, timeout=SLOW_REQUEST_TIMEOUT)
                 if resp.status_code == 200:
                     data = resp.json()
+                    st.session_state.df_manual = pd.DataFrame(data["tasks"])
                     st.success(data["message"])
                     with st.expander("Jira update log (Manual Tasks)"):
                         for r in data["jira_results"]:
@@ -411,10 +477,13 @@ elif page == "AutoPM":
 
     if st.button("Delete Task", key="delete_task_btn"):
         if task_id_to_delete.strip():
-            resp = requests.delete(f"{BACKEND_URL}/delete-task/{task_id_to_delete}")
+            resp = requests.delete(f"{BACKEND_URL}/delete-task/{task_id_to_delete}", params=project_params, timeout=SLOW_REQUEST_TIMEOUT)
             if resp.status_code == 200:
                 data = resp.json()
-                st.success(data["message"])
+                if data["status"] == "success":
+                    st.success(data["message"])
+                else:
+                    st.warning(data["message"])
             else:
                 st.error("Failed to delete task from Jira.")
         else:
@@ -426,7 +495,7 @@ elif page == "AutoPM":
 
     if st.button("Fetch Task", key="fetch_task_btn"):
         if fetch_task_id.strip():
-            resp = requests.get(f"{BACKEND_URL}/get-task/{fetch_task_id}")
+            resp = requests.get(f"{BACKEND_URL}/get-task/{fetch_task_id}", params=project_params, timeout=SLOW_REQUEST_TIMEOUT)
             if resp.status_code == 200:
                 data = resp.json()
                 if data["status"] == "success":
@@ -449,7 +518,7 @@ elif page == "AutoPM":
 
         if st.button("Update Jira", key="update_jira_btn"):
             tasks_list = st.session_state.fetched_df.to_dict(orient="records")
-            resp = requests.post(f"{BACKEND_URL}/save-tasks", json=tasks_list)
+            resp = requests.post(f"{BACKEND_URL}/save-tasks", params=project_params, json=tasks_list, timeout=SLOW_REQUEST_TIMEOUT)
             if resp.status_code == 200:
                 data = resp.json()
                 st.success(data["message"])
@@ -517,7 +586,7 @@ if st.session_state.show_chatbot:
                     })
 
                     try:
-                        resp = requests.post(f"{BACKEND_URL}/ask-question", json={"question": user_input})
+                        resp = requests.post(f"{BACKEND_URL}/ask-question", params=project_params, json={"question": user_input}, timeout=SLOW_REQUEST_TIMEOUT)
                         if resp.status_code == 200:
                             bot_response = resp.json().get("answer", "No response from AI.")
                         else:
@@ -0,0 +1,149 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import argparse
+import hashlib
+import json
+import os
+import re
+from memory_manager import load_memory, update_memory, upsert_tasks, assign_task_ids, PROJECT_ID
+from deadlines import normalize_deadlines
+from transcript_analyzer import extract_metadata_updates, extract_tasks_from_transcript, apply_metadata_updates
+
+# Loads a directory of meeting transcripts into project memory. LLM extraction runs
+# on INGEST_CONCURRENCY threads, but results are merged strictly in meeting-date
+# order. Each merged file is recorded in a checkpoint, so rerunning after an
+# interruption skips what was already ingested.
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_MAX_CONCURRENCY = 16
+# Directories the API may ingest from must live under this root
+INGEST_ROOT = os.getenv("INGEST_ROOT", "transcripts")
+CHECKPOINT_NAME = ".ingest_checkpoint_{project_id}.json"
+
+DATE_IN_NAME = re.compile(r"(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})")
+
+def meeting_date(path):
+    """Meeting date from a YYYY-MM-DD (or YYYYMMDD) stamp in the file name, else the file's mtime."""
+    match = DATE_IN_NAME.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime(*map(int, match.groups()))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+def resolve_ingest_directory(directory):
+    """Real path of directory (relative paths are taken from INGEST_ROOT) if it is inside INGEST_ROOT, else None."""
+    root = os.path.realpath(INGEST_ROOT)
+    path = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, path]) != root or not os.path.isdir(path):
+        return None
+    return path
+
+def list_transcripts(directory):
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".txt")]
+    return sorted(paths, key=lambda p: (meeting_date(p), os.path.basename(p)))
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"done": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+def _extract(path, project_id):
+    with open(path, encoding="utf-8") as f:
+        transcript = f.read().strip()
+    if not transcript:
+        return {}, []
+    memory = load_memory(project_id)
+    return extract_metadata_updates(memory, transcript), extract_tasks_from_transcript(transcript, project_id)
+
+def _merge(project_id, metadata_updates, tasks, meeting_day, file_hash):
+    # The file's hash is stored in the same write as its metadata, so a rerun after a
+    # crash between this merge and the checkpoint does not apply the meeting twice
+    def apply(memory):
+        ingested = memory.setdefault("metadata", {}).setdefault("ingested_files", [])
+        if file_hash in ingested:
+            return memory
+        apply_metadata_updates(memory, metadata_updates)
+        ingested.append(file_hash)
+        return memory
+
+    update_memory(apply, project_id)
+    if tasks:
+        # Re-mentioned tasks keep their existing ID, so they are updated rather than duplicated
+        tasks = normalize_deadlines(assign_task_ids(tasks, project_id), meeting_day)
+        upsert_tasks(tasks, project_id)
+
+def ingest_directory(directory, project_id=PROJECT_ID, concurrency=None, checkpoint_path=None, report=None):
+    """Extract and merge every transcript in directory that the checkpoint has not seen.
+
+    Stops at the first failure, leaving the checkpoint at the last merged file, so
+    a rerun continues from there. `report(**progress)` receives progress updates.
+    Returns a summary dict.
+    """
+    concurrency = concurrency or INGEST_CONCURRENCY
+    checkpoint_path = checkpoint_path or os.path.join(directory, CHECKPOINT_NAME.format(project_id=project_id))
+    checkpoint = load_checkpoint(checkpoint_path)
+    report = report or (lambda **progress: None)
+
+    paths = list_transcripts(directory)
+    hashes = {p: _file_hash(p) for p in paths}
+    todo = [p for p in paths if checkpoint["done"].get(os.path.basename(p)) != hashes[p]]
+    summary = {"total": len(paths), "skipped": len(paths) - len(todo), "ingested": 0, "tasks": 0, "failed": None}
+    report(**summary)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # A bounded window of extractions in flight, consumed in meeting order
+        remaining = iter(todo)
+        pending = deque()
+        for path in remaining:
+            pending.append((path, pool.submit(_extract, path, project_id)))
+            if len(pending) >= concurrency * 2:
+                break
+        while pending:
+            path, future = pending.popleft()
+            name = os.path.basename(path)
+            try:
+                metadata_updates, tasks = future.result()
+                _merge(project_id, metadata_updates, tasks, meeting_date(path), hashes[path])
+            except Exception as e:
+                print(f"Ingestion stopped at {name}: {e}")
+                summary["failed"] = {"file": name, "error": str(e)}
+                for _, later in pending:
+                    later.cancel()
+                break
+            checkpoint["done"][name] = hashes[path]
+            save_checkpoint(checkpoint_path, checkpoint)
+            summary["ingested"] += 1
+            summary["tasks"] += len(tasks)
+            report(**summary, current=name)
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(_extract, next_path, project_id)))
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a directory of meeting transcripts into project memory.")
+    parser.add_argument("directory")
+    parser.add_argument("--project-id", default=PROJECT_ID)
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY)
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: inside the directory)")
+    args = parser.parse_args()
+
+    def show(**progress):
+        if progress.get("current"):
+            print(f"[{progress['skipped'] + progress['ingested']}/{progress['total']}] {progress['current']}")
+
+    result = ingest_directory(args.directory, args.project_id, args.concurrency, args.checkpoint, show)
+    print(json.dumps(result, indent=2))
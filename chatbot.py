@@ -3,6 +3,7 @@ from langchain_groq import ChatGroq
 import json
 import csv
 import os
+from llm_metrics import invoke_llm
 from memory_manager import load_memory, save_memory
 
 load_dotenv()
@@ -69,6 +70,5 @@ def query_llm(memory, question):
                 Answer briefly, in 1–3 sentences, focused only on actionable suggestions or factual info based on the memory. Do proper reasoning.
                 Greet if user greets and only answer about the project when the question is about the project.
              """
-    response = llm.invoke(prompt)
-    return response.content
+    return invoke_llm(llm, prompt, "chatbot")
 
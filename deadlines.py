@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta
+import calendar
+import re
+
+# Deadlines come out of transcripts as free text ("Thursday", "by next week",
+# "March 5th"). resolve_deadline turns them into ISO dates relative to the meeting
+# date; the result is stored as deadline_date next to the original text, with the
+# meeting date it was resolved against as meeting_date. Vague periods resolve to
+# their last working day: "next week" is the Friday of next week.
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "ten": 10}
+
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+MONTH_DAY = re.compile(rf"\b{_MONTH}\s+{_DAY}(?:,?\s+(\d{{4}}))?\b")
+DAY_MONTH = re.compile(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH}(?:,?\s+(\d{{4}}))?\b")
+IN_PERIOD = re.compile(r"\bin\s+(\d+|a|an|one|two|three|four|five|six|seven|ten)\s+(day|week|month)s?\b")
+WEEKDAY = re.compile(r"\b(next|this|coming)?\s*(" + "|".join(WEEKDAYS) + r")\b")
+
+def _as_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+def _month_end(year, month):
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+def _friday(day):
+    return day + timedelta(days=(4 - day.weekday()) % 7) if day.weekday() <= 4 else day
+
+def _dated(year, month, day, base):
+    try:
+        resolved = date(int(year) if year else base.year, month, int(day))
+    except ValueError:
+        return None
+    # "March 5" said in December means next year's March
+    if not year and resolved < base:
+        try:
+            resolved = resolved.replace(year=resolved.year + 1)
+        except ValueError:
+            # Feb 29 has no next-year counterpart
+            return None
+    return resolved
+
+def valid_meeting_date(value):
+    """Whether value can serve as a meeting date (None means today)."""
+    try:
+        _as_date(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def resolve_deadline(text, meeting_date=None):
+    """ISO date (YYYY-MM-DD) for a free-text deadline, or None if it cannot be resolved."""
+    if not text:
+        return None
+    try:
+        resolved = _resolve(str(text).strip().lower(), _as_date(meeting_date))
+    except (TypeError, ValueError, OverflowError):
+        # Malformed meeting date, or a period past the last representable date
+        return None
+    return resolved.isoformat() if resolved else None
+
+def _resolve(t, base):
+    resolved = None
+    m = ISO_DATE.search(t)
+    if m:
+        try:
+            resolved = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            return None
+    elif MONTH_DAY.search(t):
+        m = MONTH_DAY.search(t)
+        resolved = _dated(m.group(3), MONTHS.index(m.group(1)) + 1, m.group(2), base)
+    elif DAY_MONTH.search(t):
+        m = DAY_MONTH.search(t)
+        resolved = _dated(m.group(3), MONTHS.index(m.group(2)) + 1, m.group(1), base)
+    elif "day after tomorrow" in t:
+        resolved = base + timedelta(days=2)
+    elif "tomorrow" in t:
+        resolved = base + timedelta(days=1)
+    elif re.search(r"\b(today|tonight|eod|end of (the )?day)\b", t):
+        resolved = base
+    elif IN_PERIOD.search(t):
+        m = IN_PERIOD.search(t)
+        n = int(m.group(1)) if m.group(1).isdigit() else NUMBERS[m.group(1)]
+        if m.group(2) == "month":
+            month = base.month - 1 + n
+            year, month = base.year + month // 12, month % 12 + 1
+            resolved = date(year, month, min(base.day, _month_end(year, month).day))
+        else:
+            resolved = base + timedelta(days=n * (7 if m.group(2) == "week" else 1))
+    elif "next week" in t:
+        resolved = _friday(base + timedelta(days=7 - base.weekday()))
+    elif re.search(r"\b(this week|end of (the )?week|eow)\b", t):
+        resolved = _friday(base)
+    elif "next month" in t:
+        year, month = (base.year + 1, 1) if base.month == 12 else (base.year, base.month + 1)
+        resolved = _month_end(year, month)
+    elif re.search(r"\b(this month|end of (the )?month|eom)\b", t):
+        resolved = _month_end(base.year, base.month)
+    elif WEEKDAY.search(t):
+        m = WEEKDAY.search(t)
+        weekday = WEEKDAYS.index(m.group(2))
+        if m.group(1) == "next":
+            resolved = base + timedelta(days=7 - base.weekday() + weekday)
+        else:
+            resolved = base + timedelta(days=(weekday - base.weekday()) % 7 or 7)
+    return resolved
+
+def normalize_deadlines(tasks, meeting_date=None):
+    """Set meeting_date and deadline_date (resolved from the deadline text) on each task; returns the tasks."""
+    meeting_day = _as_date(meeting_date).isoformat()
+    for task in tasks:
+        task["meeting_date"] = meeting_day
+        task["deadline_date"] = resolve_deadline(task.get("deadline"), meeting_day)
+    return tasks
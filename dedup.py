@@ -0,0 +1,84 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+import hashlib
+import random
+import re
+
+# Near-duplicate detection for tasks re-mentioned in later meetings. Each task is
+# reduced to character shingles of its description plus its assignee, summarised by
+# a MinHash signature and bucketed with LSH bands, so finding candidates does not
+# compare every pair. Candidates are confirmed with the exact shingle Jaccard and a
+# close match on the description itself, since tasks differing by one word
+# ("the landing page" / "the pricing page") share most of their shingles.
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+DUPLICATE_THRESHOLD = 0.8
+DESCRIPTION_THRESHOLD = 0.85
+_STOPWORDS = {"a", "an", "the"}
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text or "").lower()).split())
+
+def _description(task):
+    return " ".join(w for w in _normalize(task.get("task")).split() if w not in _STOPWORDS)
+
+def shingles(task):
+    text = _description(task)
+    grams = {text[i:i + SHINGLE_SIZE] for i in range(max(len(text) - SHINGLE_SIZE + 1, 1))}
+    grams.add("@" + _normalize(task.get("assignee")))
+    return grams
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash(shingle_set):
+    hashes = [_hash(s) for s in shingle_set]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+class TaskIndex:
+    """LSH index over existing tasks; find_duplicate returns the closest match or None."""
+
+    def __init__(self, tasks=(), threshold=DUPLICATE_THRESHOLD, description_threshold=DESCRIPTION_THRESHOLD):
+        self.threshold = threshold
+        self.description_threshold = description_threshold
+        self.rows = NUM_PERM // BANDS
+        self.buckets = defaultdict(list)
+        self.entries = []
+        for task in tasks:
+            self.add(task)
+
+    def _bands(self, signature):
+        return [(band, tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(BANDS)]
+
+    def add(self, task):
+        grams = shingles(task)
+        self.entries.append((task, grams, _description(task)))
+        for key in self._bands(minhash(grams)):
+            self.buckets[key].append(len(self.entries) - 1)
+
+    def find_duplicate(self, task, exclude_ids=()):
+        grams = shingles(task)
+        description = _description(task)
+        assignee = _normalize(task.get("assignee"))
+        candidates = {i for key in self._bands(minhash(grams)) for i in self.buckets.get(key, [])}
+        best, best_score = None, self.threshold
+        for i in candidates:
+            existing, existing_grams, existing_description = self.entries[i]
+            # A similar task for a different person is a different task
+            if _normalize(existing.get("assignee")) != assignee or existing.get("id") in exclude_ids:
+                continue
+            score = jaccard(grams, existing_grams)
+            if score < best_score:
+                continue
+            if SequenceMatcher(None, description, existing_description).ratio() >= self.description_threshold:
+                best, best_score = existing, score
+        return best
@@ -0,0 +1,156 @@
+import copy
+from datetime import datetime
+import time
+from storage import apply_update
+
+# Every memory mutation is appended as an event tagged with the project version it
+# produced. Every SNAPSHOT_EVERY versions the state is materialized into a snapshot,
+# so a point-in-time read replays at most SNAPSHOT_EVERY events.
+
+APPEND_ATTEMPTS = 3
+APPEND_RETRY_SECONDS = 0.05
+
+_baselined = set()
+
+class EventLogError(Exception):
+    """An event could not be appended, or the log has a gap where one is missing."""
+
+def _encode_update(update):
+    # Stored as [operator, path, value] triples: "$"-prefixed and dotted field
+    # names are not safe to store as document keys on every Mongo version.
+    return [[op, path, value] for op, fields in (update or {}).items() for path, value in fields.items()]
+
+def _decode_update(triples):
+    update = {}
+    for op, path, value in triples or []:
+        update.setdefault(op, {})[path] = value
+    return update
+
+def _encode_task_op(op):
+    if op[0] == "update":
+        return ["update", op[1], _encode_update(op[2])]
+    return list(op)
+
+def record_event(backend, project_id, version, update=None, replace=None, task_ops=None, snapshot_every=50):
+    """Append the event that moved a project to `version`, snapshotting every N versions."""
+    event = {
+        "project_id": project_id,
+        "version": version,
+        "at": datetime.utcnow().isoformat(),
+        "update": _encode_update(update),
+        "replace": replace,
+        "task_ops": [_encode_task_op(op) for op in task_ops or []]
+    }
+    try:
+        _append(backend, event)
+    except EventLogError:
+        # Replays must not cross the missing event: start them from live state instead
+        snapshot_live(backend, project_id)
+        raise
+    if snapshot_every and version % snapshot_every == 0:
+        try:
+            memory = materialize(backend, project_id, version)
+        except EventLogError as e:
+            # A lost event (or a concurrent writer's not yet appended): the replay
+            # can't be trusted, but the live state can
+            print(f"Snapshotting live state of project {project_id} at version {version}: {e}")
+            snapshot_live(backend, project_id)
+            return
+        if memory is not None and memory.get("version") == version:
+            backend.insert_snapshot({"project_id": project_id, "version": version, "at": event["at"], "memory": memory})
+
+def snapshot_live(backend, project_id):
+    """Snapshot the project's current stored state, so later replays start after any gap."""
+    try:
+        memory = backend.find_project(project_id)
+        if memory is None:
+            return
+        memory["tasks"] = backend.find_tasks(project_id)
+        # A write in between would leave tasks and version out of step; the next gap check retries
+        current = backend.find_project(project_id, ["version"])
+        if current is None or current.get("version") != memory.get("version"):
+            return
+        backend.insert_snapshot({
+            "project_id": project_id,
+            "version": memory.get("version") or 0,
+            "at": datetime.utcnow().isoformat(),
+            "memory": memory
+        })
+    except Exception as e:
+        print(f"Could not snapshot project {project_id}: {e}")
+
+def _append(backend, event):
+    for attempt in range(APPEND_ATTEMPTS):
+        try:
+            backend.append_event(event)
+            return
+        except Exception as e:
+            error = e
+            # The failed attempt may have been written after all
+            if backend.find_events(event["project_id"], after_version=event["version"] - 1, up_to_version=event["version"]):
+                return
+            time.sleep(APPEND_RETRY_SECONDS * (attempt + 1))
+    raise EventLogError(f"Could not append event {event['version']} for project {event['project_id']}: {error}")
+
+def ensure_baseline(backend, memory):
+    """Snapshot a project the first time it is seen without any snapshot (new or pre-event-log projects)."""
+    project_id = memory["_id"]
+    if project_id in _baselined:
+        return
+    if backend.find_snapshot(project_id) is None:
+        backend.insert_snapshot({
+            "project_id": project_id,
+            "version": memory.get("version") or 0,
+            "at": datetime.utcnow().isoformat(),
+            "memory": copy.deepcopy(dict(memory))
+        })
+    _baselined.add(project_id)
+
+def apply_event(memory, event):
+    if event.get("replace") is not None:
+        memory = dict(copy.deepcopy(event["replace"]), tasks=memory.get("tasks", []))
+    if event.get("update"):
+        apply_update(memory, _decode_update(event["update"]))
+    if event.get("task_ops"):
+        memory["tasks"] = apply_task_ops(memory.get("tasks", []), event["task_ops"])
+    memory["version"] = event["version"]
+    return memory
+
+def apply_task_ops(tasks, ops):
+    """Apply recorded ("upsert" | "update" | "delete", task_id, ...) operations to a list of tasks."""
+    by_id = {t.get("id"): t for t in tasks}
+    for op in ops:
+        task_id = op[1]
+        if op[0] == "delete":
+            by_id.pop(task_id, None)
+        elif op[0] == "upsert":
+            by_id[task_id] = dict(by_id.get(task_id, {"id": task_id}), **copy.deepcopy(op[2]))
+        elif op[0] == "update" and task_id in by_id:
+            by_id[task_id] = apply_update(by_id[task_id], _decode_update(op[2]))
+    return list(by_id.values())
+
+def materialize(backend, project_id, version=None, at=None):
+    """Rebuild a project's memory as of a version or an ISO timestamp.
+
+    Starts from the latest snapshot at or before that point and replays the
+    events after it. Returns None if the project has no history that far back;
+    raises EventLogError if an event in between is missing.
+    """
+    if version is None and at is not None:
+        snapshot = backend.find_snapshot(project_id, until=at)
+        if snapshot is None:
+            return None
+        events = backend.find_events(project_id, after_version=snapshot["version"], until=at)
+    else:
+        snapshot = backend.find_snapshot(project_id, max_version=version)
+        if snapshot is None:
+            return None
+        events = backend.find_events(project_id, after_version=snapshot["version"], up_to_version=version)
+    memory = copy.deepcopy(snapshot["memory"])
+    expected = snapshot["version"] + 1
+    for event in events:
+        if event["version"] != expected:
+            raise EventLogError(f"Event {expected} of project {project_id} is missing")
+        memory = apply_event(memory, event)
+        expected += 1
+    return memory
@@ -1,7 +1,11 @@
 import csv
 import os
+import threading
 from dotenv import load_dotenv
 from jira import JIRA
+from jira.exceptions import JIRAError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
 
 load_dotenv()
 
@@ -10,24 +14,136 @@ JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
 JIRA_URL = os.getenv("JIRA_URL")
 JIRA_PROJECT_KEY = os.getenv("JIRA_PROJECT_KEY")
 
+# One JIRA client is shared by the whole process. Its session keeps up to
+# JIRA_POOL_SIZE keep-alive connections, so requests after the first skip the TLS
+# handshake and the server-info round trip that constructing JIRA() costs.
+JIRA_POOL_SIZE = int(os.getenv("JIRA_POOL_SIZE", "10"))
+JIRA_CONNECT_TIMEOUT = float(os.getenv("JIRA_CONNECT_TIMEOUT", "5"))
+JIRA_READ_TIMEOUT = float(os.getenv("JIRA_READ_TIMEOUT", "30"))
+JIRA_MAX_RETRIES = int(os.getenv("JIRA_MAX_RETRIES", "3"))
+
+# Existing issues for a sync batch are found with "labels in (...)" searches of up
+# to JIRA_LABELS_PER_QUERY task labels, fetched JIRA_SEARCH_PAGE_SIZE issues a page.
+JIRA_LABELS_PER_QUERY = int(os.getenv("JIRA_LABELS_PER_QUERY", "100"))
+JIRA_SEARCH_PAGE_SIZE = int(os.getenv("JIRA_SEARCH_PAGE_SIZE", "100"))
+
+# New issues are created with bulk requests of up to JIRA_BULK_CREATE_SIZE issues
+# (Jira accepts at most 50 per request)
+JIRA_BULK_CREATE_SIZE = min(int(os.getenv("JIRA_BULK_CREATE_SIZE", "50")), 50)
+
 priority_map = {"High": "High", "Medium": "Medium", "Low": "Low"}
 
-def update_jira_from_csv(filename):
+_client = None
+_client_lock = threading.Lock()
+
+def _connect():
     jira = JIRA(
         server=JIRA_URL,
-        basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN)
+        basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN),
+        timeout=(JIRA_CONNECT_TIMEOUT, JIRA_READ_TIMEOUT),
+        max_retries=JIRA_MAX_RETRIES
     )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=JIRA_POOL_SIZE)
+    jira._session.mount("https://", adapter)
+    jira._session.mount("http://", adapter)
+    return jira
+
+def get_jira():
+    """The shared JIRA client, connected on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _connect()
+    return _client
+
+def reset_jira(stale=None):
+    """Drop the shared client so the next get_jira() reconnects.
+
+    With `stale`, only drops it if it is still that client, so threads that hit
+    the same failure reconnect once. The old client is not closed: other
+    threads may still be mid-request on it, and it is released once they are done.
+    """
+    global _client
+    with _client_lock:
+        if stale is None or _client is stale:
+            _client = None
+
+def _is_reconnectable(error):
+    if isinstance(error, RequestsConnectionError):
+        return True
+    return isinstance(error, JIRAError) and error.status_code == 401
+
+def with_jira(fn):
+    """Run fn(jira) on the shared client, reconnecting and retrying once on auth or connection failure."""
+    jira = get_jira()
+    try:
+        return fn(jira)
+    except Exception as e:
+        if not _is_reconnectable(e):
+            raise
+        print(f"Jira connection lost ({e}), reconnecting")
+        reset_jira(jira)
+        return fn(get_jira())
+
+def find_issues_by_task_id(jira, task_ids):
+    """Map each task id (as a string) that already has a Jira issue to that issue."""
+    labels = {f"taskid_{task_id}": str(task_id) for task_id in task_ids}
+    names = list(labels)
+    found = {}
+    for i in range(0, len(names), JIRA_LABELS_PER_QUERY):
+        quoted = ", ".join(f'"{name}"' for name in names[i:i + JIRA_LABELS_PER_QUERY])
+        jql = f"project = {JIRA_PROJECT_KEY} AND labels in ({quoted}) ORDER BY key"
+        start = 0
+        while True:
+            page = jira.search_issues(jql, startAt=start, maxResults=JIRA_SEARCH_PAGE_SIZE, fields="labels")
+            for issue in page:
+                for label in issue.fields.labels:
+                    if label in labels:
+                        found.setdefault(labels[label], issue)
+            start += len(page)
+            # The server may cap maxResults below JIRA_SEARCH_PAGE_SIZE, so page on the total
+            if not page or start >= page.total:
+                break
+    return found
+
+TASK_FIELDS = ["id", "giver", "assignee", "task", "deadline", "deliverable", "priority", "status"]
+
+def update_jira_from_csv(filename):
     if not os.path.exists(filename):
         return ["CSV file not found"]
 
-    results = []
-
     with open(filename, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         tasks = [row for row in reader]
 
-    for task in tasks:
+    return sync_tasks_to_jira(tasks)
+
+def sync_tasks_to_jira(tasks):
+    """Create or update one Jira issue per task; returns the log messages."""
+    # Same shape as CSV rows: every field present, as text
+    tasks = [{key: "" if task.get(key) is None else str(task.get(key)) for key in TASK_FIELDS} for task in tasks]
+    # Kept across with_jira's reconnect-and-retry, so a replay skips tasks already
+    # synced and never creates an issue twice (search may not show it yet)
+    progress = {"messages": [[] for _ in tasks], "done": set(), "created": {}}
+    return with_jira(lambda jira: _sync_tasks(jira, tasks, progress))
+
+def _sync_tasks(jira, tasks, progress):
+    # Messages are collected per task so the log stays in CSV order even though
+    # new tasks are created in bulk after the updates
+    messages, done, created = progress["messages"], progress["done"], progress["created"]
+    pending = [i for i in range(len(tasks)) if i not in done]
+    to_create = []
+    existing = find_issues_by_task_id(jira, [tasks[i]["id"] for i in pending if i not in created])
+    for i in pending:
+        task = tasks[i]
         task_id = task["id"]
+        if i in created:
+            # Created before a reconnect; only its status is left to set
+            messages[i] = messages[i][:1] + _set_status(jira, created[i], task["status"])
+            done.add(i)
+            continue
+
         summary = f"[{task_id}] {task['task']}"
         description = (
             f"*Task ID:* {task_id}\n"
@@ -39,18 +155,16 @@ def update_jira_from_csv(filename):
             f"*Status (from transcript):* {task['status']}\n"
         )
 
-        jql = f'project = {JIRA_PROJECT_KEY} AND labels = "taskid_{task_id}"'
-        existing_issues = jira.search_issues(jql)
-
-        if existing_issues:
-            issue = existing_issues[0]
+        if str(task_id) in existing:
+            issue = existing[str(task_id)]
             issue.update(
                 summary=summary,
                 description=description,
                 priority={"name": priority_map.get(task["priority"], "Medium")},
                 fields={"labels": [f"taskid_{task_id}"]}
             )
-            results.append(f"♻️ Updated {issue.key} → {summary}")
+            messages[i] = [f"♻️ Updated {issue.key} → {summary}"] + _set_status(jira, issue.key, task["status"])
+            done.add(i)
         else:
             issue_dict = {
                 "project": {"key": JIRA_PROJECT_KEY},
@@ -61,32 +175,51 @@ def update_jira_from_csv(filename):
                 "priority": {"name": priority_map.get(task["priority"], "Medium")},
                 "labels": [f"taskid_{task_id}"]
             }
-            issue = jira.create_issue(fields=issue_dict)
-            results.append(f"✅ Created {issue.key} → {summary}")
+            to_create.append((i, issue_dict))
 
-        desired_status = task["status"].lower()
-        transitions = jira.transitions(issue)
-        transition_id = None
+    for b in range(0, len(to_create), JIRA_BULK_CREATE_SIZE):
+        batch = to_create[b:b + JIRA_BULK_CREATE_SIZE]
+        try:
+            outcomes = jira.create_issues([issue_dict for _, issue_dict in batch], prefetch=False)
+        except JIRAError as e:
+            if _is_reconnectable(e):
+                raise
+            print(f"Jira bulk create failed: {e}")
+            outcomes = [{"status": "Error", "error": e.text, "issue": None} for _ in batch]
+        # Record every created issue before the next request can fail
+        for (i, issue_dict), outcome in zip(batch, outcomes):
+            if outcome["status"] == "Success":
+                created[i] = outcome["issue"].key
+                messages[i] = [f"✅ Created {created[i]} → {issue_dict['summary']}"]
+            else:
+                messages[i] = [f"❌ Could not create {issue_dict['summary']}: {outcome['error']}"]
+                done.add(i)
+        for i, _ in batch:
+            if i in created and i not in done:
+                messages[i] = messages[i][:1] + _set_status(jira, created[i], tasks[i]["status"])
+                done.add(i)
 
-        for t in transitions:
-            if t["name"].lower() == desired_status:
-                transition_id = t["id"]
-                break
+    return [message for task_messages in messages for message in task_messages]
 
-        if transition_id:
-            jira.transition_issue(issue, transition_id)
-            results.append(f"   ↪ Status moved to {task['status']}")
-        else:
-            results.append(f"   ⚠️ Could not set status for {issue.key} (maybe already correct)")
+def _set_status(jira, issue_key, status):
+    desired_status = status.lower()
+    transitions = jira.transitions(issue_key)
+    transition_id = None
 
-    return results
+    for t in transitions:
+        if t["name"].lower() == desired_status:
+            transition_id = t["id"]
+            break
+
+    if transition_id:
+        jira.transition_issue(issue_key, transition_id)
+        return [f"   ↪ Status moved to {status}"]
+    return [f"   ⚠️ Could not set status for {issue_key} (maybe already correct)"]
 
 def delete_task_from_jira(task_id):
-    jira = JIRA(
-        server=JIRA_URL,
-        basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN)
-    )
+    return with_jira(lambda jira: _delete_task(jira, task_id))
 
+def _delete_task(jira, task_id):
     jql = f'project = {JIRA_PROJECT_KEY} AND labels = "taskid_{task_id}"'
     issues = jira.search_issues(jql)
 
@@ -99,11 +232,9 @@ def delete_task_from_jira(task_id):
     return f"🗑️ Deleted {key} (Task ID {task_id})"
     
 def fetch_task_from_jira(task_id):
-    jira = JIRA(
-        server=JIRA_URL,
-        basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN)
-    )
+    return with_jira(lambda jira: _fetch_task(jira, task_id))
 
+def _fetch_task(jira, task_id):
     jql = f'project = {JIRA_PROJECT_KEY} AND labels = "taskid_{task_id}"'
     issues = jira.search_issues(jql)
 
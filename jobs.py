@@ -0,0 +1,105 @@
+from datetime import datetime
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Long-running work (LLM extraction) runs on a small local worker pool instead of
+# inside the HTTP request. At most JOB_WORKERS jobs run at once and at most
+# JOB_QUEUE_DEPTH wait; finished jobs are kept for JOB_RESULT_TTL_SECONDS so
+# clients can collect the result.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "20"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+
+FINISHED = ("done", "failed")
+
+class JobQueueFull(Exception):
+    pass
+
+_jobs = {}
+_queue = queue.Queue(maxsize=JOB_QUEUE_DEPTH)
+_lock = threading.Lock()
+_changed = threading.Condition(_lock)
+_workers = []
+
+def _start_workers():
+    while len(_workers) < JOB_WORKERS:
+        worker = threading.Thread(target=_work, name=f"job-worker-{len(_workers)}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+def _update(job_id, **fields):
+    with _changed:
+        job = _jobs[job_id]
+        job.update(fields)
+        job["revision"] += 1
+        _changed.notify_all()
+
+def _work():
+    while True:
+        job_id, fn, args = _queue.get()
+        _update(job_id, status="running", started_at=datetime.utcnow().isoformat())
+        report = lambda **progress: _update(job_id, progress=dict(_jobs[job_id]["progress"], **progress))
+        try:
+            result = fn(report, *args)
+            _update(job_id, status="done", result=result, finished_at=datetime.utcnow().isoformat(), finished=time.time())
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            _update(job_id, status="failed", error=str(e), finished_at=datetime.utcnow().isoformat(), finished=time.time())
+        finally:
+            _queue.task_done()
+
+def _prune():
+    cutoff = time.time() - JOB_RESULT_TTL_SECONDS
+    for job_id in [j["id"] for j in _jobs.values() if j["finished"] and j["finished"] < cutoff]:
+        del _jobs[job_id]
+
+def submit_job(kind, fn, *args):
+    """Queue fn(report, *args) and return the job id.
+
+    `report(**progress)` lets the job publish progress fields. Raises JobQueueFull
+    when JOB_QUEUE_DEPTH jobs are already waiting.
+    """
+    job_id = uuid.uuid4().hex
+    with _lock:
+        _start_workers()
+        _prune()
+        _jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "finished": None,
+            "revision": 0
+        }
+    try:
+        _queue.put_nowait((job_id, fn, args))
+    except queue.Full:
+        with _lock:
+            del _jobs[job_id]
+        raise JobQueueFull(f"{JOB_QUEUE_DEPTH} jobs are already waiting")
+    return job_id
+
+def get_job(job_id):
+    """Snapshot of a job, or None if unknown (or expired)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        snapshot = {k: v for k, v in job.items() if k != "finished"}
+        snapshot["progress"] = dict(job["progress"])
+        snapshot["queue_depth"] = _queue.qsize()
+        return snapshot
+
+def wait_for_change(job_id, revision, timeout):
+    """Block until the job's revision moves past `revision` or timeout; returns the job snapshot."""
+    with _changed:
+        _changed.wait_for(lambda: _jobs.get(job_id) is None or _jobs[job_id]["revision"] != revision, timeout)
+    return get_job(job_id)
@@ -0,0 +1,82 @@
+import json
+import re
+
+# LLM output is not always bare JSON: it may be wrapped in ```json fences or followed
+# by a sentence of commentary. These helpers locate the JSON value instead of
+# assuming the whole completion is one.
+
+_decoder = json.JSONDecoder()
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+def extract_json(text):
+    """Parse the first JSON object or array in text, ignoring fences and surrounding prose."""
+    text = _FENCE.sub("", text or "")
+    for i, ch in enumerate(text):
+        if ch in "[{":
+            try:
+                return _decoder.raw_decode(text, i)[0]
+            except json.JSONDecodeError:
+                continue
+    # Nothing decodable: raise the usual error for the caller to report
+    return json.loads(text)
+
+class ArrayObjectParser:
+    """Incrementally parses a streamed JSON array, yielding each element object once it closes.
+
+    Text before the opening "[" (fences, prose) is skipped, as is anything after the
+    closing "]". Only objects directly inside the top-level array are yielded.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.done = False
+        self.object_start = None
+
+    def feed(self, text):
+        """Add streamed text and return the list of element objects completed by it."""
+        if self.done:
+            return []
+        self.buffer += text
+        completed = []
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                    self.depth = 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                if ch == "{" and self.depth == 1:
+                    self.object_start = self.pos
+                self.depth += 1
+            elif ch in "]}":
+                self.depth -= 1
+                if ch == "}" and self.depth == 1 and self.object_start is not None:
+                    try:
+                        completed.append(json.loads(self.buffer[self.object_start:self.pos + 1]))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed streamed object: {e}")
+                    self.object_start = None
+                elif self.depth == 0:
+                    self.done = True
+                    break
+            self.pos += 1
+        # Drop text that can no longer be part of a pending object
+        keep = self.object_start if self.object_start is not None else self.pos
+        self.buffer = self.buffer[keep:]
+        self.pos -= keep
+        if self.object_start is not None:
+            self.object_start = 0
+        return completed
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Disk-backed cache of LLM responses, keyed by a hash of the model, its sampling
+# parameters and the exact prompt. Entries expire after LLM_CACHE_TTL_SECONDS and the
+# least recently used ones are evicted once the cache exceeds LLM_CACHE_MAX_BYTES.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+MODEL_PARAMS = ("model_name", "temperature", "max_tokens", "top_p", "stop", "model_kwargs")
+
+_conn = None
+_lock = threading.Lock()
+
+class CachedResponse:
+    """Stands in for the LLM message on a cache hit."""
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+def _connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+        _conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY, content TEXT, usage TEXT, size INTEGER, created REAL, accessed REAL)""")
+        _conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+        _conn.commit()
+    return _conn
+
+def cache_key(llm, prompt):
+    params = {name: getattr(llm, name, None) for name in MODEL_PARAMS}
+    payload = json.dumps({"params": params, "prompt": prompt}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cached(key):
+    """Return the cached response for key, or None if missing or expired."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        row = conn.execute("SELECT content, usage, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[2] > LLM_CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+        conn.commit()
+    return CachedResponse(row[0], json.loads(row[1]) if row[1] else None)
+
+def put_cached(key, response):
+    if not LLM_CACHE_ENABLED:
+        return
+    content = response.content
+    usage = getattr(response, "usage_metadata", None)
+    usage = json.dumps(dict(usage)) if usage else None
+    size = len(content.encode("utf-8")) + len(key)
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, content, usage, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, content, usage, size, now, now)
+        )
+        _evict(conn, now)
+        conn.commit()
+
+def _evict(conn, now):
+    conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - LLM_CACHE_TTL_SECONDS,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+    for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed").fetchall():
+        conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        total -= size
+        if total <= LLM_CACHE_MAX_BYTES:
+            break
+
+def clear_cache():
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM llm_cache")
+        conn.commit()
+
+def cache_info():
+    with _lock:
+        count, size = _connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+    return {"enabled": LLM_CACHE_ENABLED, "entries": count, "bytes": size, "max_bytes": LLM_CACHE_MAX_BYTES}
@@ -0,0 +1,223 @@
+from datetime import datetime
+import asyncio
+import json
+import os
+import threading
+import time
+from llm_cache import cache_key, get_cached, put_cached, CachedResponse
+from json_stream import extract_json
+
+# Every LLM call goes through invoke_llm / ainvoke_llm so prompt size, latency and
+# failures are tracked per call site. Stats live in-process (get_llm_stats); when
+# LLM_LOG_PATH is set each call is also appended there as one JSON line. Identical
+# prompts are answered from the persistent response cache in llm_cache.
+LLM_LOG_PATH = os.getenv("LLM_LOG_PATH", "")
+
+_stats = {}
+_lock = threading.Lock()
+
+def _token_counts(prompt, response):
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), False
+    # No usage reported (e.g. a failed call): estimate at ~4 characters per token
+    content = getattr(response, "content", "") or ""
+    return len(prompt) // 4 + 1, (len(content) // 4 + 1) if content else 0, True
+
+def _site_stats(site):
+    return _stats.setdefault(site, {
+        "calls": 0, "cache_hits": 0, "skipped": 0, "failures": 0, "errors": {},
+        "prompt_tokens": 0, "completion_tokens": 0, "max_prompt_tokens": 0,
+        "queue_ms": 0.0, "network_ms": 0.0, "parse_ms": 0.0, "max_network_ms": 0.0
+    })
+
+def _record(site, prompt, response, queue_s, network_s, parse_s, error=None, cached=False, first_token_s=None):
+    prompt_tokens, completion_tokens, estimated = _token_counts(prompt, response)
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "site": site,
+        "ok": error is None,
+        "error": error,
+        "cached": cached,
+        "prompt_chars": len(prompt),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_estimated": estimated,
+        "queue_ms": round(queue_s * 1000, 1),
+        "network_ms": round(network_s * 1000, 1),
+        "parse_ms": round(parse_s * 1000, 1)
+    }
+    if first_token_s is not None:
+        entry["first_token_ms"] = round(first_token_s * 1000, 1)
+    with _lock:
+        s = _site_stats(site)
+        s["calls"] += 1
+        if cached:
+            s["cache_hits"] += 1
+        if error is not None:
+            s["failures"] += 1
+            s["errors"][error] = s["errors"].get(error, 0) + 1
+        s["prompt_tokens"] += prompt_tokens
+        s["completion_tokens"] += completion_tokens
+        s["max_prompt_tokens"] = max(s["max_prompt_tokens"], prompt_tokens)
+        for stage in ("queue_ms", "network_ms", "parse_ms"):
+            s[stage] += entry[stage]
+        s["max_network_ms"] = max(s["max_network_ms"], entry["network_ms"])
+        if LLM_LOG_PATH:
+            try:
+                with open(LLM_LOG_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Could not write LLM log: {e}")
+
+def record_skip(site):
+    """Count an LLM call that the pre-extractor decided was not needed."""
+    with _lock:
+        _site_stats(site)["skipped"] += 1
+
+def invoke_llm(llm, prompt, site, parse=None, queued_at=None):
+    """Call llm.invoke(prompt) and record it under `site`.
+
+    `parse` is applied to the response content and timed separately; `queued_at`
+    (a time.perf_counter() value) marks when the call was requested, so time spent
+    waiting for a worker or semaphore shows up as queue time. Returns the parsed
+    content, or the raw content when no parser is given. Only responses that parse
+    are cached.
+    """
+    started = time.perf_counter()
+    key = cache_key(llm, prompt)
+    response = get_cached(key)
+    cached = response is not None
+    if not cached:
+        try:
+            response = llm.invoke(prompt)
+        except Exception as e:
+            _record(site, prompt, None, _queue(started, queued_at), time.perf_counter() - started, 0.0, type(e).__name__)
+            raise
+    result = _finish(site, prompt, response, cached, started, queued_at, parse)
+    if not cached:
+        _put_cached(key, response)
+    return result
+
+async def ainvoke_llm(llm, prompt, site, parse=None, queued_at=None):
+    """Async counterpart of invoke_llm, using llm.ainvoke.
+
+    The SQLite cache is read and written in a worker thread, off the event loop.
+    """
+    started = time.perf_counter()
+    key = cache_key(llm, prompt)
+    response = await asyncio.to_thread(get_cached, key)
+    cached = response is not None
+    if not cached:
+        try:
+            response = await llm.ainvoke(prompt)
+        except Exception as e:
+            _record(site, prompt, None, _queue(started, queued_at), time.perf_counter() - started, 0.0, type(e).__name__)
+            raise
+    result = _finish(site, prompt, response, cached, started, queued_at, parse)
+    if not cached:
+        await asyncio.to_thread(_put_cached, key, response)
+    return result
+
+def stream_llm(llm, prompt, site):
+    """Yield text pieces from llm.stream(prompt), recording the call once the stream ends.
+
+    The full completion is cached if it contains parseable JSON; a cache hit is
+    yielded as a single piece.
+    """
+    started = time.perf_counter()
+    key = cache_key(llm, prompt)
+    cached = get_cached(key)
+    if cached is not None:
+        _record(site, prompt, cached, 0.0, 0.0, 0.0, cached=True, first_token_s=0.0)
+        yield cached.content
+        return
+    pieces, usage, first_token_s = [], None, None
+    try:
+        for chunk in llm.stream(prompt):
+            if first_token_s is None:
+                first_token_s = time.perf_counter() - started
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            pieces.append(chunk.content)
+            yield chunk.content
+    except Exception as e:
+        _record(site, prompt, None, 0.0, time.perf_counter() - started, 0.0, type(e).__name__, first_token_s=first_token_s)
+        raise
+    response = CachedResponse("".join(pieces), usage)
+    if _end_stream(site, prompt, response, started, first_token_s):
+        _put_cached(key, response)
+
+async def astream_llm(llm, prompt, site):
+    """Async counterpart of stream_llm, using llm.astream; the cache is used from a worker thread."""
+    started = time.perf_counter()
+    key = cache_key(llm, prompt)
+    cached = await asyncio.to_thread(get_cached, key)
+    if cached is not None:
+        _record(site, prompt, cached, 0.0, 0.0, 0.0, cached=True, first_token_s=0.0)
+        yield cached.content
+        return
+    pieces, usage, first_token_s = [], None, None
+    try:
+        async for chunk in llm.astream(prompt):
+            if first_token_s is None:
+                first_token_s = time.perf_counter() - started
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            pieces.append(chunk.content)
+            yield chunk.content
+    except Exception as e:
+        _record(site, prompt, None, 0.0, time.perf_counter() - started, 0.0, type(e).__name__, first_token_s=first_token_s)
+        raise
+    response = CachedResponse("".join(pieces), usage)
+    if _end_stream(site, prompt, response, started, first_token_s):
+        await asyncio.to_thread(_put_cached, key, response)
+
+def _end_stream(site, prompt, response, started, first_token_s):
+    """Record a finished stream; returns whether the completion parses and may be cached."""
+    network_s = time.perf_counter() - started
+    try:
+        extract_json(response.content)
+    except ValueError as e:
+        _record(site, prompt, response, 0.0, network_s, 0.0, type(e).__name__, first_token_s=first_token_s)
+        return False
+    _record(site, prompt, response, 0.0, network_s, 0.0, first_token_s=first_token_s)
+    return True
+
+def _put_cached(key, response):
+    try:
+        put_cached(key, response)
+    except Exception as e:
+        print(f"Could not cache LLM response: {e}")
+
+def _queue(started, queued_at):
+    return started - queued_at if queued_at else 0.0
+
+def _finish(site, prompt, response, cached, started, queued_at, parse):
+    parsed_at = time.perf_counter()
+    network_s = 0.0 if cached else parsed_at - started
+    try:
+        result = parse(response.content) if parse else response.content
+    except Exception as e:
+        _record(site, prompt, response, _queue(started, queued_at), network_s, time.perf_counter() - parsed_at, type(e).__name__, cached)
+        raise
+    _record(site, prompt, response, _queue(started, queued_at), network_s, time.perf_counter() - parsed_at, cached=cached)
+    return result
+
+def get_llm_stats():
+    """Per call-site totals plus averages per call."""
+    with _lock:
+        stats = {}
+        for site, s in _stats.items():
+            calls = s["calls"] or 1
+            stats[site] = dict(
+                s,
+                errors=dict(s["errors"]),
+                avg_prompt_tokens=round(s["prompt_tokens"] / calls, 1),
+                avg_queue_ms=round(s["queue_ms"] / calls, 1),
+                avg_network_ms=round(s["network_ms"] / calls, 1),
+                avg_parse_ms=round(s["parse_ms"] / calls, 1)
+            )
+        return stats
+
+def reset_llm_stats():
+    with _lock:
+        _stats.clear()
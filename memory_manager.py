@@ -1,20 +1,312 @@
-from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import copy
+import hashlib
+import os
+import random
+import threading
+import time
+from storage import MongoBackend, SQLiteBackend, project_fields
+from dedup import TaskIndex
+from deadlines import resolve_deadline
+import event_log
+
+# Storage backend: "mongo" (default) or "sqlite" (embedded; use SQLITE_PATH=":memory:" for a throwaway store)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "ai_pm.db")
 
 MONGO_URI = "your mongodb local host url"
 DB_NAME = "ai_pm"
 COLLECTION_NAME = "memory"
+TASKS_COLLECTION_NAME = "tasks"
+# Project used when a caller does not name one
+PROJECT_ID = "project_ai_pm"
+
+# Connection pool sizing; async callers share an executor of the same size.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MEMORY_EXECUTOR_WORKERS = int(os.getenv("MEMORY_EXECUTOR_WORKERS", str(MONGO_MAX_POOL_SIZE)))
+
+# Read-through cache of loaded memory, validated against the document version.
+# The dedup index of each project's tasks is cached the same way.
+CACHE_TTL_SECONDS = 300
+CACHE_MAX_ENTRIES = 32
+
+# Optimistic concurrency: how often update_memory() re-runs a mutation after a conflict.
+SAVE_MAX_RETRIES = 5
+SAVE_RETRY_BACKOFF_SECONDS = 0.05
+
+# Event log: every mutation is appended as an event; state is snapshotted every N versions.
+SNAPSHOT_EVERY = int(os.getenv("MEMORY_SNAPSHOT_EVERY", "50"))
+
+# Hot/cold tiering: Done tasks and old notes move to the archive past these limits.
+ARCHIVE_DONE_AFTER_DAYS = int(os.getenv("ARCHIVE_DONE_AFTER_DAYS", "14"))
+ARCHIVE_MAX_HOT_DONE_TASKS = int(os.getenv("ARCHIVE_MAX_HOT_DONE_TASKS", "50"))
+ARCHIVE_MAX_HOT_NOTES = int(os.getenv("ARCHIVE_MAX_HOT_NOTES", "50"))
+
+# Task IDs come from one atomic counter shared by all projects (Jira issues are
+# labelled by task id), starting above every id already stored.
+TASK_ID_SEQUENCE = "task_id"
+TASK_ID_START = 1001
+
+_backend = None
+_backend_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Bumped on every invalidation; a load only caches what it read if its project's
+# counter has not moved since the load started
+_cache_generations = {}
+_index_cache = OrderedDict()
+_change_stream_active = False
+_task_ids_seeded = False
+_executor = ThreadPoolExecutor(max_workers=MEMORY_EXECUTOR_WORKERS, thread_name_prefix="memory")
+
+class MemoryConflictError(Exception):
+    """Raised when the project document changed between load_memory() and save_memory()."""
+
+def _create_backend():
+    if STORAGE_BACKEND == "mongo":
+        return MongoBackend(
+            MONGO_URI,
+            DB_NAME,
+            projects_collection=COLLECTION_NAME,
+            tasks_collection=TASKS_COLLECTION_NAME,
+            max_pool_size=MONGO_MAX_POOL_SIZE,
+            min_pool_size=MONGO_MIN_POOL_SIZE,
+            default_project_id=PROJECT_ID
+        )
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(SQLITE_PATH)
+    raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'")
+
+def get_backend():
+    """Return the storage backend, creating it (and its indexes) on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = _create_backend()
+                backend.ensure_indexes()
+                _backend = backend
+    return _backend
+
+def set_backend(backend):
+    """Use the given backend from now on, e.g. SQLiteBackend(":memory:") in tests."""
+    global _backend
+    with _backend_lock:
+        backend.ensure_indexes()
+        _backend = backend
+    invalidate_cache()
+
+def _migrate_embedded_tasks(memory):
+    """Move tasks still embedded in the project document into the tasks collection."""
+    embedded = memory.pop("tasks", None)
+    backend = get_backend()
+    if embedded:
+        for task in embedded:
+            backend.insert_task(memory["_id"], task)
+    if embedded is not None:
+        update = {"$unset": {"tasks": ""}}
+        backend.update_project(memory["_id"], dict(update, **{"$inc": {"version": 1}}))
+        memory["version"] = memory.get("version", 0) + 1
+        _record_event(memory["_id"], memory["version"], update=update,
+                      task_ops=[("upsert", t["id"], dict(t)) for t in embedded or [] if "id" in t])
+
+def _record_event(project_id, version, **changes):
+    # Raises event_log.EventLogError if the append keeps failing: the write itself
+    # went through, but every later replay depends on this event
+    event_log.record_event(get_backend(), project_id, version, snapshot_every=SNAPSHOT_EVERY, **changes)
+
+def _touch_project(project_id, task_ops=None):
+    update = {"$set": {"metadata.updated_at": datetime.utcnow().isoformat()}}
+    version = get_backend().increment_version(project_id, update)
+    invalidate_cache(project_id)
+    if version is not None:
+        _record_event(project_id, version, update=update, task_ops=task_ops)
+    return version
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["cached_at"] > CACHE_TTL_SECONDS:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry
+
+def _cache_generation(key):
+    with _cache_lock:
+        return _cache_generations.get(key, 0), _cache_generations.get(None, 0)
+
+def _cache_put(key, memory, generation):
+    with _cache_lock:
+        if (_cache_generations.get(key, 0), _cache_generations.get(None, 0)) != generation:
+            # Invalidated while loading: what was read may already be stale
+            return
+        _cache[key] = {"version": memory.get("version"), "memory": memory, "cached_at": time.monotonic()}
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def invalidate_cache(key=None):
+    """Drop one cached project, or the whole cache when no key is given."""
+    with _cache_lock:
+        _cache_generations[key] = _cache_generations.get(key, 0) + 1
+        if key is None:
+            _cache.clear()
+            _index_cache.clear()
+        else:
+            _cache.pop(key, None)
+
+def start_cache_invalidation_listener():
+    """Invalidate the cache from the backend's change feed (Mongo: a change stream on a replica set).
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db[COLLECTION_NAME]
+    While the listener is running, cached reads skip the per-request version
+    check, since every write from any worker is delivered to this process.
+    Returns False if the backend has no change feed.
+    """
+    global _change_stream_active
+    try:
+        changed_projects = get_backend().watch_projects()
+    except Exception as e:
+        print(f"Change stream unavailable, falling back to version checks: {e}")
+        return False
 
-def load_memory():
-    """Load the project memory from MongoDB."""
-    memory = collection.find_one({"_id": "project_ai_pm"})
+    def listen():
+        global _change_stream_active
+        try:
+            for project_id in changed_projects:
+                invalidate_cache(project_id)
+        except Exception as e:
+            print(f"Change stream stopped: {e}")
+        finally:
+            _change_stream_active = False
+            invalidate_cache()
+
+    _change_stream_active = True
+    threading.Thread(target=listen, daemon=True).start()
+    return True
+
+class TrackedMemory(dict):
+    """Project memory that remembers its last persisted state.
+
+    save_memory() diffs the current contents against that state and sends only
+    the changed paths as $set/$push/$pull/$unset operators, while task changes
+    are written to the task store one document at a time.
+    """
+
+    def __init__(self, data, snapshot=None):
+        super().__init__(data)
+        if snapshot is None:
+            self.mark_clean()
+        else:
+            self._snapshot = snapshot
+
+    def mark_clean(self):
+        self._snapshot = copy.deepcopy(dict(self))
+
+    def changes(self):
+        """Return (project_update, task_ops) describing what changed since the last save."""
+        update = {}
+        for key in set(self) | set(self._snapshot):
+            if key in ("_id", "tasks", "version"):
+                continue
+            if key not in self:
+                update.setdefault("$unset", {})[key] = ""
+            elif key not in self._snapshot:
+                update.setdefault("$set", {})[key] = self[key]
+            else:
+                _diff_value(self._snapshot[key], self[key], key, update)
+        return update, _diff_tasks(self._snapshot.get("tasks", []), self.get("tasks", []))
+
+def _diff_value(old, new, path, update):
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in set(old) | set(new):
+            sub_path = f"{path}.{key}"
+            if key not in new:
+                update.setdefault("$unset", {})[sub_path] = ""
+            elif key not in old:
+                update.setdefault("$set", {})[sub_path] = new[key]
+            else:
+                _diff_value(old[key], new[key], sub_path, update)
+    elif isinstance(old, list) and isinstance(new, list):
+        if len(new) > len(old) and new[:len(old)] == old:
+            update.setdefault("$push", {})[path] = {"$each": new[len(old):]}
+            return
+        removed = [item for item in old if item not in new]
+        if removed and [item for item in old if item not in removed] == new:
+            update.setdefault("$pull", {})[path] = {"$in": removed}
+            return
+        update.setdefault("$set", {})[path] = new
+    else:
+        update.setdefault("$set", {})[path] = new
+
+def _diff_tasks(old_tasks, new_tasks):
+    old_by_id = {t["id"]: t for t in old_tasks if "id" in t}
+    new_by_id = {t["id"]: t for t in new_tasks if "id" in t}
+    ops = []
+    for task_id, task in new_by_id.items():
+        if task_id not in old_by_id:
+            ops.append(("upsert", task_id, dict(task)))
+        elif task != old_by_id[task_id]:
+            update = {}
+            for key, value in task.items():
+                if old_by_id[task_id].get(key) != value:
+                    update.setdefault("$set", {})[key] = value
+            for key in old_by_id[task_id]:
+                if key not in task:
+                    update.setdefault("$unset", {})[key] = ""
+            ops.append(("update", task_id, update))
+    for task_id in old_by_id:
+        if task_id not in new_by_id:
+            ops.append(("delete", task_id))
+    return ops
+
+def _load_fields(project_id, fields):
+    doc_fields = [f for f in fields if f != "tasks"]
+    entry = _cache_get(project_id) if _change_stream_active else None
+    if entry is not None:
+        memory = copy.deepcopy(project_fields(entry["memory"], fields))
+    else:
+        memory = {"_id": project_id}
+        if doc_fields:
+            memory = get_backend().find_project(project_id, doc_fields)
+            if memory is None:
+                return project_fields(dict(load_memory(project_id)), fields)
+        if "tasks" in fields:
+            memory["tasks"] = get_tasks(project_id)
+    return memory
+
+def load_memory(project_id=PROJECT_ID, fields=None):
+    """Load a project's memory, served from the cache while its version is current.
+
+    With fields (top-level or dotted paths, plus "tasks"), only those are read
+    and a plain read-only dict is returned instead of a TrackedMemory.
+    """
+    if fields is not None:
+        return _load_fields(project_id, fields)
+    backend = get_backend()
+    generation = _cache_generation(project_id)
+    entry = _cache_get(project_id)
+    if entry is not None:
+        if _change_stream_active:
+            fresh = True
+        else:
+            current = backend.find_project(project_id, ["version"])
+            fresh = current is not None and current.get("version") == entry["version"]
+        if fresh:
+            return TrackedMemory(copy.deepcopy(entry["memory"]), snapshot=entry["memory"])
+
+    memory = backend.find_project(project_id)
     if not memory:
         memory = {
-            "_id": "project_ai_pm",
+            "_id": project_id,
             "project_name": "",
             "project_info": {
                 "description": "",
@@ -23,25 +315,334 @@ def load_memory():
                 "notes": []
             },
             "team": [],
-            "tasks": [],
             "context_notes": [],
             "metadata": {
                 "created_at": datetime.utcnow().isoformat(),
                 "updated_at": datetime.utcnow().isoformat(),
                 "meeting_count": 0
-            }
+            },
+            "version": 1
         }
-        collection.insert_one(memory)
-    return memory
+        if not backend.insert_project(memory):
+            # Another worker created the project first
+            return load_memory(project_id)
+    else:
+        _migrate_embedded_tasks(memory)
+    memory["tasks"] = get_tasks(project_id)
+    event_log.ensure_baseline(backend, memory)
+    _cache_put(project_id, memory, generation)
+    return TrackedMemory(copy.deepcopy(memory), snapshot=memory)
 
 def save_memory(memory):
-    """Save updated memory back to MongoDB."""
+    """Save updated memory back to storage, writing only the fields that changed.
+
+    The write only applies if the stored version still matches the version the
+    memory was loaded at; otherwise MemoryConflictError is raised and nothing
+    is written.
+    """
+    backend = get_backend()
+    project_id = memory["_id"]
     memory["metadata"]["updated_at"] = datetime.utcnow().isoformat()
-    collection.replace_one({"_id": "project_ai_pm"}, memory, upsert=True)
+    if not isinstance(memory, TrackedMemory):
+        doc = {k: v for k, v in memory.items() if k != "tasks"}
+        doc["version"] = (memory.get("version") or 0) + 1
+        saved = backend.replace_project(project_id, doc, memory.get("version"))
+        invalidate_cache(project_id)
+        if not saved:
+            raise MemoryConflictError(f"Project {project_id} was modified concurrently")
+        memory["version"] = doc["version"]
+        _record_event(project_id, doc["version"], replace=doc)
+        return
 
-def log_memory_status():
-    memory = load_memory()
-    print(f"Total tasks in memory: {len(memory.get('tasks', []))}")
+    if "tasks" in memory:
+        # Tasks added or edited through the memory object get their deadline_date too
+        stored = {t["id"]: t for t in memory._snapshot.get("tasks", []) if "id" in t}
+        memory["tasks"] = [
+            t if t == stored.get(t.get("id")) else _with_deadline_date(t, stored.get(t.get("id")))
+            for t in memory["tasks"]
+        ]
+    update, task_ops = memory.changes()
+    update["$inc"] = {"version": 1}
+    expected = memory.get("version") or 0
+    saved = backend.update_project(project_id, update, memory.get("version"))
+    invalidate_cache(project_id)
+    if not saved:
+        raise MemoryConflictError(f"Project {project_id} was modified concurrently")
+    memory["version"] = expected + 1
+    if task_ops:
+        # Tasks are written before any event: a failed append must not leave the
+        # metadata saved and the tasks dropped
+        backend.apply_task_ops(project_id, task_ops)
+    try:
+        _record_event(project_id, expected + 1, update=update, task_ops=task_ops)
+    finally:
+        if task_ops:
+            # A load between the project write and the task writes can cache the new
+            # version with the old tasks; bumping the version again once the tasks are
+            # written makes any such entry fail its version check.
+            version = _touch_project(project_id)
+            if version == expected + 2:
+                memory["version"] = version
+            # Otherwise another writer got in first: keep the older version so saving
+            # this memory again raises MemoryConflictError
+    memory.mark_clean()
+
+def update_memory(mutate, project_id=PROJECT_ID, max_retries=SAVE_MAX_RETRIES):
+    """Load memory, apply mutate(memory) and save it, retrying on concurrent writes.
+
+    mutate may run several times, so it must only depend on the memory passed
+    in. Returns whatever the last call of mutate returned.
+    """
+    for attempt in range(max_retries + 1):
+        memory = load_memory(project_id)
+        result = mutate(memory)
+        update, task_ops = memory.changes()
+        if not update and not task_ops:
+            return result
+        try:
+            save_memory(memory)
+            return result
+        except MemoryConflictError:
+            if attempt == max_retries:
+                raise
+            time.sleep(SAVE_RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.random())
+
+def load_memory_at(project_id=PROJECT_ID, version=None, at=None):
+    """Point-in-time read: the project's memory as of a version or ISO timestamp, or None."""
+    return event_log.materialize(get_backend(), project_id, version=version, at=at)
+
+def get_events(project_id=PROJECT_ID, after_version=None, up_to_version=None):
+    """Return the project's recorded mutations, oldest first."""
+    return get_backend().find_events(project_id, after_version=after_version, up_to_version=up_to_version)
+
+def list_projects():
+    """Return the id and name of every stored project."""
+    return [
+        {"project_id": doc["_id"], "project_name": doc.get("project_name", "")}
+        for doc in get_backend().list_projects()
+    ]
+
+def get_tasks(project_id=PROJECT_ID, query=None):
+    """Return a project's tasks matching the query, ordered by task id."""
+    return get_backend().find_tasks(project_id, query)
+
+def get_upcoming_tasks(project_id=PROJECT_ID, days=None, today=None):
+    """Open tasks due from today (within `days`, if given), soonest first."""
+    today = today or datetime.utcnow().date().isoformat()
+    window = {"$gte": today}
+    if days is not None:
+        window["$lte"] = (datetime.fromisoformat(today) + timedelta(days=days)).date().isoformat()
+    tasks = get_tasks(project_id, {"deadline_date": window, "status": {"$ne": "Done"}})
+    return sorted(tasks, key=lambda t: t["deadline_date"])
+
+def get_overdue_tasks(project_id=PROJECT_ID, today=None):
+    """Open tasks whose deadline_date has passed, most overdue first."""
+    today = today or datetime.utcnow().date().isoformat()
+    tasks = get_tasks(project_id, {"deadline_date": {"$lt": today}, "status": {"$ne": "Done"}})
+    return sorted(tasks, key=lambda t: t["deadline_date"])
+
+def _with_deadline_date(fields, stored=None):
+    """fields with deadline_date resolved from its deadline text.
+
+    A deadline_date sent by the caller is never trusted, since it may predate an
+    edit of the text. The stored date is kept while the text and meeting date are
+    unchanged; otherwise the text is resolved again against the meeting date
+    (today for tasks that have none).
+    """
+    if "deadline" not in fields:
+        return fields
+    stored = stored or {}
+    meeting_day = fields.get("meeting_date") or stored.get("meeting_date")
+    if "deadline_date" in stored and stored.get("deadline") == fields["deadline"] and meeting_day == stored.get("meeting_date"):
+        return dict(fields, deadline_date=stored["deadline_date"])
+    return dict(fields, deadline_date=resolve_deadline(fields["deadline"], meeting_day))
+
+def _stored_tasks(project_id, task_ids):
+    if not task_ids:
+        return {}
+    return {t["id"]: t for t in get_tasks(project_id, {"id": {"$in": list(task_ids)}})}
+
+def get_task(task_id, project_id=PROJECT_ID):
+    return get_backend().find_task(project_id, task_id)
+
+def add_task(task, project_id=PROJECT_ID):
+    """Insert a single task. Returns False if the project already has a task with that id."""
+    task = _with_deadline_date(task)
+    if not get_backend().insert_task(project_id, task):
+        return False
+    _touch_project(project_id, [("upsert", task["id"], dict(task))])
+    return True
+
+def update_task(task, project_id=PROJECT_ID):
+    """Update the fields of an existing task. Returns False if no task has that id."""
+    fields = {k: v for k, v in task.items() if k not in ("_id", "project_id")}
+    fields = _with_deadline_date(fields, get_task(task["id"], project_id))
+    if not get_backend().update_task(project_id, task["id"], {"$set": fields}):
+        return False
+    _touch_project(project_id, [("update", task["id"], {"$set": fields})])
+    return True
+
+def upsert_tasks(tasks, project_id=PROJECT_ID):
+    """Insert new tasks and update existing ones in a single bulk write."""
+    if not tasks:
+        return 0
+    stored = _stored_tasks(project_id, {t["id"] for t in tasks})
+    ops = [
+        ("upsert", t["id"], _with_deadline_date({k: v for k, v in t.items() if k not in ("_id", "project_id")}, stored.get(t["id"])))
+        for t in tasks
+    ]
+    get_backend().apply_task_ops(project_id, ops)
+    _touch_project(project_id, ops)
+    return len(ops)
+
+def allocate_task_ids(count=1):
+    """Reserve `count` consecutive task IDs and return the first."""
+    global _task_ids_seeded
+    backend = get_backend()
+    floor = 0
+    if not _task_ids_seeded:
+        # First allocation in this process: never hand out an id that is already in use
+        floor = max(backend.max_task_id() or 0, TASK_ID_START - 1)
+    first = backend.next_sequence(TASK_ID_SEQUENCE, count, floor)
+    _task_ids_seeded = True
+    return first
+
+class TaskIdAssigner:
+    """Assigns final IDs to extracted tasks for one project.
+
+    A task that re-mentions an existing one (same assignee, near-identical
+    description) takes over its ID, so saving it updates that task and its Jira
+    issue. Each existing ID is taken at most once per assigner, so two different
+    tasks never collapse into one. New tasks are only matched against stored
+    ones, so every task of a batch that matches none gets its own fresh ID.
+    """
+
+    def __init__(self, project_id=PROJECT_ID):
+        self.index = _task_index(project_id)
+        self.claimed = set()
+
+    def assign(self, tasks):
+        new = []
+        for task in tasks:
+            match = self.index.find_duplicate(task, exclude_ids=self.claimed)
+            if match is None:
+                new.append(task)
+            else:
+                task["id"] = match["id"]
+                self.claimed.add(match["id"])
+        if new:
+            first = allocate_task_ids(len(new))
+            for offset, task in enumerate(new):
+                task["id"] = first + offset
+        return tasks
+
+def _task_index(project_id):
+    """The dedup index of a project's stored tasks, rebuilt only once its version moves."""
+    current = get_backend().find_project(project_id, ["version"])
+    version = current.get("version") if current else None
+    with _cache_lock:
+        entry = _index_cache.get(project_id)
+        if entry is not None and entry[0] == version:
+            _index_cache.move_to_end(project_id)
+            return entry[1]
+    # Tasks are read after the version, so the index is never older than the version it is cached under
+    index = TaskIndex(get_tasks(project_id))
+    with _cache_lock:
+        _index_cache[project_id] = (version, index)
+        _index_cache.move_to_end(project_id)
+        while len(_index_cache) > CACHE_MAX_ENTRIES:
+            _index_cache.popitem(last=False)
+    return index
+
+def assign_task_ids(tasks, project_id=PROJECT_ID):
+    return TaskIdAssigner(project_id).assign(tasks)
+
+def delete_task(task_id, project_id=PROJECT_ID):
+    """Delete a task by id. Returns the number of deleted tasks."""
+    deleted = get_backend().delete_task(project_id, task_id)
+    if deleted:
+        _touch_project(project_id, [("delete", task_id)])
+    return deleted
+
+def archive_cold_data(project_id=PROJECT_ID, now=None):
+    """Move Done tasks and old notes out of the hot memory into the archive.
+
+    A Done task is stamped with completed_at the first time it is seen here and
+    archived once that is ARCHIVE_DONE_AFTER_DAYS old, or earlier if more than
+    ARCHIVE_MAX_HOT_DONE_TASKS are Done. Notes are appended in meeting order, so
+    everything but the newest ARCHIVE_MAX_HOT_NOTES is archived. Items are
+    copied to the archive before they leave the hot memory.
+    """
+    now = now or datetime.utcnow()
+    stamp = now.isoformat()
+    cutoff = (now - timedelta(days=ARCHIVE_DONE_AFTER_DAYS)).isoformat()
+
+    def tier(memory):
+        done = [t for t in memory.get("tasks", []) if t.get("status") == "Done"]
+        for task in done:
+            task.setdefault("completed_at", stamp)
+        done.sort(key=lambda t: t["completed_at"])
+        overflow = max(len(done) - ARCHIVE_MAX_HOT_DONE_TASKS, 0)
+        cold_tasks = [t for i, t in enumerate(done) if i < overflow or t["completed_at"] <= cutoff]
+
+        notes = memory.get("project_info", {}).get("notes", [])
+        cold_notes = notes[:max(len(notes) - ARCHIVE_MAX_HOT_NOTES, 0)]
+
+        entries = [
+            {"kind": "task", "key": f"{t['id']}@{t['completed_at']}", "item": copy.deepcopy(t), "archived_at": stamp}
+            for t in cold_tasks
+        ] + [
+            {"kind": "note", "key": hashlib.sha1(str(n).encode("utf-8")).hexdigest(), "item": {"text": n}, "archived_at": stamp}
+            for n in cold_notes
+        ]
+        get_backend().archive_items(memory["_id"], entries)
+
+        cold_ids = {t["id"] for t in cold_tasks}
+        memory["tasks"] = [t for t in memory.get("tasks", []) if t.get("id") not in cold_ids]
+        if cold_notes:
+            memory["project_info"]["notes"] = notes[len(cold_notes):]
+        return {"tasks_archived": len(cold_tasks), "notes_archived": len(cold_notes)}
+
+    return update_memory(tier, project_id)
+
+def find_archived(project_id=PROJECT_ID, kind="task", query=None, limit=100, skip=0):
+    """Query the cold tier: kind is "task" (filter on task fields) or "note"."""
+    return [entry["item"] for entry in get_backend().find_archived(project_id, kind, query, limit, skip)]
+
+def log_memory_status(project_id=PROJECT_ID):
+    print(f"Total tasks in memory: {get_backend().count_tasks(project_id)}")
+
+
+# Async variants for coroutine handlers: storage calls run on the memory executor
+# so they never block the event loop.
+
+async def _run_in_executor(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, lambda: fn(*args))
+
+async def aload_memory(project_id=PROJECT_ID):
+    return await _run_in_executor(load_memory, project_id)
+
+async def asave_memory(memory):
+    return await _run_in_executor(save_memory, memory)
+
+async def aupdate_memory(mutate, project_id=PROJECT_ID, max_retries=SAVE_MAX_RETRIES):
+    return await _run_in_executor(update_memory, mutate, project_id, max_retries)
+
+async def aget_tasks(project_id=PROJECT_ID, query=None):
+    return await _run_in_executor(get_tasks, project_id, query)
+
+async def aadd_task(task, project_id=PROJECT_ID):
+    return await _run_in_executor(add_task, task, project_id)
+
+async def aupdate_task(task, project_id=PROJECT_ID):
+    return await _run_in_executor(update_task, task, project_id)
+
+async def aupsert_tasks(tasks, project_id=PROJECT_ID):
+    return await _run_in_executor(upsert_tasks, tasks, project_id)
+
+async def adelete_task(task_id, project_id=PROJECT_ID):
+    return await _run_in_executor(delete_task, task_id, project_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import re
+
+# Fast local pass over a transcript, run before any LLM call. It finds the speakers,
+# names that are not in memory["team"] yet, sentences that state project facts and
+# sentences that look like action items. The extractor uses it to skip the metadata
+# prompt when nothing new was said and to send the task prompt only the turns
+# around candidate action items. It never skips the task prompt: when no candidate
+# is found the whole transcript is sent, so a regex miss cannot drop a task.
+
+# "Name:" or "Name (Role):" at the start of a line opens a new speaker turn
+SPEAKER_TURN = re.compile(r"^[ \t]*(?P<name>[A-Z][\w.' -]{0,40}?)(?:[ \t]*\((?P<role>[^)\n]*)\))?:", re.MULTILINE)
+
+# Speaker labels that are not people
+GENERIC_SPEAKERS = {"manager", "pm", "host", "moderator", "facilitator", "speaker", "unknown", "everyone", "all", "team"}
+
+# Turns on either side of an action item kept for context ("Can you ...?" / "Sure.")
+ACTION_CONTEXT_TURNS = 1
+
+_APOS = "['’]"
+INTRODUCTION = re.compile(
+    rf"\b(?i:I{_APOS}m|I am|my name is|this is|meet|welcome|introducing|joined by|say hi to)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)"
+)
+PROJECT_FACT = re.compile(
+    r"\bproject\b.{0,40}\b(?:called|named|name|title|about|goal|scope|description)\b"
+    r"|\b(?:our|the) project is\b"
+    r"|\b(?:start date|end date|launch|release date|go-live|kickoff|milestone)\b"
+    r"|\b(?:joining|joined|leaving|left the team|our new|new (?:member|hire|joiner)|take over|taking over|role|responsible for)\b"
+    r"|\b(?:note that|remember that|fyi|heads up)\b",
+    re.IGNORECASE
+)
+ACTION_ITEM = re.compile(
+    rf"\b(?:can you|could you|would you|will you|please|I{_APOS}ll|I will|we{_APOS}ll|we will|I{_APOS}m going to|going to"
+    rf"|needs? to|have to|has to|should|must|let{_APOS}s|make sure|take care of|handle|assign(?:ed)?|owner"
+    r"|deadline|due|by (?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|tomorrow|today|tonight|eod|end of|next|this)"
+    r"|finish(?:ed)?|complete(?:d)?|done|shipped|deliver(?:ed)?|working on|follow up|action item|to-?do"
+    r"|wrap(?:ped)? up|pick(?:ed)? up|take over|took over|start(?:ed|ing)? on|blocked|today|tomorrow|yesterday)\b",
+    re.IGNORECASE
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def split_speaker_turns(transcript):
+    """Split a transcript into speaker turns; text before the first speaker is its own turn."""
+    starts = [m.start() for m in SPEAKER_TURN.finditer(transcript)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    turns = [transcript[a:b].strip() for a, b in zip(starts, starts[1:] + [len(transcript)])]
+    return [t for t in turns if t]
+
+def _member_name(member):
+    return member.get("name", "") if isinstance(member, dict) else str(member)
+
+def _is_known(name, team_tokens):
+    tokens = name.lower().split()
+    return bool(tokens) and all(t in team_tokens for t in tokens)
+
+def analyze_transcript(transcript, memory):
+    """Local analysis of a transcript against project memory.
+
+    Returns speakers, new_names, project_facts, action_items, needs_metadata (False
+    when the metadata prompt can be skipped) and task_text (the turns around the
+    action items, or the whole transcript when none were found).
+    """
+    team_tokens = {t for m in memory.get("team", []) for t in _member_name(m).lower().split()}
+    turns = split_speaker_turns(transcript)
+
+    speakers, new_names, facts, actions, action_turns = [], [], [], [], set()
+    for i, turn in enumerate(turns):
+        match = SPEAKER_TURN.match(turn)
+        text = turn
+        if match:
+            name, role = match.group("name").strip(), (match.group("role") or "").strip()
+            text = turn[match.end():]
+            if name.lower() not in GENERIC_SPEAKERS:
+                if not any(s["name"] == name for s in speakers):
+                    speakers.append({"name": name, "role": role})
+                if not _is_known(name, team_tokens) and name not in new_names:
+                    new_names.append(name)
+        for name in INTRODUCTION.findall(text):
+            if not _is_known(name, team_tokens) and name not in new_names:
+                new_names.append(name)
+        for sentence in SENTENCE_END.split(text.strip()):
+            if PROJECT_FACT.search(sentence):
+                facts.append(sentence)
+            if ACTION_ITEM.search(sentence):
+                actions.append(sentence)
+                action_turns.add(i)
+
+    keep = sorted({j for i in action_turns
+                   for j in range(i - ACTION_CONTEXT_TURNS, i + ACTION_CONTEXT_TURNS + 1) if 0 <= j < len(turns)})
+    spans, previous = [], None
+    for j in keep:
+        if previous is not None and j != previous + 1:
+            spans.append("...")
+        spans.append(turns[j])
+        previous = j
+
+    needs_metadata = bool(
+        new_names or facts
+        or not memory.get("team")
+        or not memory.get("project_info", {}).get("description")
+    )
+    return {
+        "speakers": speakers,
+        "new_names": new_names,
+        "project_facts": facts,
+        "action_items": actions,
+        "needs_metadata": needs_metadata,
+        "task_text": "\n".join(spans) if spans else transcript
+    }
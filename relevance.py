@@ -0,0 +1,70 @@
+import math
+import re
+from collections import Counter
+
+# Local BM25 ranking used to keep prompts small: only the memory items that share
+# vocabulary with the current transcript are sent to the LLM.
+
+STOPWORDS = {
+    "a", "about", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be", "been", "but", "by",
+    "can", "could", "do", "for", "from", "get", "got", "had", "has", "have", "he", "her", "his", "how", "i",
+    "if", "in", "into", "is", "it", "its", "just", "let", "ll", "m", "me", "my", "no", "not", "now", "of",
+    "ok", "okay", "on", "or", "our", "s", "she", "should", "so", "some", "than", "that", "the", "their",
+    "them", "then", "there", "they", "this", "to", "up", "us", "was", "we", "were", "what", "when", "which",
+    "who", "will", "with", "would", "yes", "you", "your"
+}
+
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", str(text or "").lower()) if t not in STOPWORDS]
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+class BM25Index:
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = [Counter(tokenize(d)) for d in documents]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.docs)) if self.docs else 0
+        df = Counter(term for d in self.docs for term in d)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query):
+        terms = set(tokenize(query)) & self.idf.keys()
+        results = []
+        for doc, length in zip(self.docs, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+    def top_k(self, query, k):
+        """Indices of the k best-scoring documents with a non-zero score, best first."""
+        scores = self.scores(query)
+        ranked = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: -scores[i])
+        return ranked[:k]
+
+def select_relevant(items, text, query, k, token_budget, render=None):
+    """Pick the top-k items relevant to query whose rendered lines fit in token_budget.
+
+    `text` gives the words an item is indexed on, `render` the line it costs in
+    the prompt (defaults to `text`). Returns the selected items in their original order.
+    """
+    if not items:
+        return []
+    render = render or text
+    chosen, used = [], 0
+    for i in BM25Index([text(item) for item in items]).top_k(query, k):
+        cost = estimate_tokens(render(items[i]))
+        if used + cost > token_budget:
+            continue
+        chosen.append(i)
+        used += cost
+    return [items[i] for i in sorted(chosen)]
@@ -0,0 +1,763 @@
+from contextlib import contextmanager
+import copy
+import json
+import sqlite3
+import threading
+
+try:
+    from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne, DeleteOne
+    from pymongo.errors import DuplicateKeyError
+except ImportError:  # only the Mongo backend needs pymongo
+    MongoClient = None
+
+
+class StorageBackend:
+    """Persistence operations used by memory_manager.
+
+    Project documents are plain dicts keyed by "_id" and updated with
+    Mongo-style operators ($set, $unset, $inc, $push, $pull). Tasks are
+    stored per project and keyed by (project_id, id). Task batches are
+    lists of ("upsert", task_id, fields), ("update", task_id, update) or
+    ("delete", task_id) tuples.
+    """
+
+    def ensure_indexes(self):
+        pass
+
+    def find_project(self, project_id, fields=None):
+        raise NotImplementedError
+
+    def insert_project(self, doc):
+        """Insert a new project document. Returns False if it already exists."""
+        raise NotImplementedError
+
+    def update_project(self, project_id, update, expected_version=None):
+        """Apply an update, only if the stored version matches when one is given.
+
+        Returns False if no document matched.
+        """
+        raise NotImplementedError
+
+    def replace_project(self, project_id, doc, expected_version=None):
+        raise NotImplementedError
+
+    def increment_version(self, project_id, update=None):
+        """Apply an update together with a version increment; return the new version or None."""
+        raise NotImplementedError
+
+    def list_projects(self):
+        raise NotImplementedError
+
+    def find_tasks(self, project_id, query=None):
+        """Return the project's tasks matching query, ordered by task id."""
+        raise NotImplementedError
+
+    def find_task(self, project_id, task_id):
+        raise NotImplementedError
+
+    def insert_task(self, project_id, task):
+        """Insert a task. Returns False if the project already has a task with that id."""
+        raise NotImplementedError
+
+    def update_task(self, project_id, task_id, update):
+        """Apply an update to one task. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    def delete_task(self, project_id, task_id):
+        """Delete one task and return the number of deleted tasks."""
+        raise NotImplementedError
+
+    def apply_task_ops(self, project_id, ops):
+        raise NotImplementedError
+
+    def count_tasks(self, project_id):
+        raise NotImplementedError
+
+    def watch_projects(self):
+        """Return an iterator of ids of changed projects, across all processes."""
+        raise NotImplementedError(f"{type(self).__name__} has no change feed")
+
+    def append_event(self, event):
+        raise NotImplementedError
+
+    def find_events(self, project_id, after_version=None, up_to_version=None, until=None):
+        """Return events ordered by version, filtered by version range and ISO timestamp."""
+        raise NotImplementedError
+
+    def insert_snapshot(self, snapshot):
+        raise NotImplementedError
+
+    def find_snapshot(self, project_id, max_version=None, until=None):
+        """Return the latest snapshot at or before max_version / until, if any."""
+        raise NotImplementedError
+
+    def archive_items(self, project_id, entries):
+        """Store cold entries ({"kind", "key", "item", "archived_at"}), idempotent per key."""
+        raise NotImplementedError
+
+    def find_archived(self, project_id, kind, query=None, limit=100, skip=0):
+        """Return archived items of one kind matching query, newest first."""
+        raise NotImplementedError
+
+    def next_sequence(self, name, count=1, floor=0):
+        """Atomically reserve `count` values of a named counter and return the first.
+
+        Values at or below floor are never handed out.
+        """
+        raise NotImplementedError
+
+    def max_task_id(self):
+        """Highest numeric task id across all projects, hot or archived (None if there are none)."""
+        raise NotImplementedError
+
+
+# ---------------- Mongo-style document helpers ---------------- #
+
+def _get_path(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None, False
+        doc = doc[part]
+    return doc, True
+
+def _parent(doc, path, create=True):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        if part not in doc or not isinstance(doc[part], dict):
+            if not create:
+                return None, parts[-1]
+            doc[part] = {}
+        doc = doc[part]
+    return doc, parts[-1]
+
+def apply_update(doc, update):
+    """Apply Mongo-style update operators to a dict in place."""
+    for path, value in update.get("$set", {}).items():
+        parent, key = _parent(doc, path)
+        parent[key] = copy.deepcopy(value)
+    for path in update.get("$unset", {}):
+        parent, key = _parent(doc, path, create=False)
+        if parent is not None:
+            parent.pop(key, None)
+    for path, value in update.get("$inc", {}).items():
+        parent, key = _parent(doc, path)
+        parent[key] = (parent.get(key) or 0) + value
+    for path, value in update.get("$push", {}).items():
+        parent, key = _parent(doc, path)
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        parent.setdefault(key, []).extend(copy.deepcopy(items))
+    for path, value in update.get("$pull", {}).items():
+        parent, key = _parent(doc, path, create=False)
+        if parent is None or not isinstance(parent.get(key), list):
+            continue
+        removed = value["$in"] if isinstance(value, dict) and "$in" in value else [value]
+        parent[key] = [item for item in parent[key] if item not in removed]
+    return doc
+
+def matches(doc, query):
+    """Evaluate a Mongo-style filter (equality and comparison operators) against a dict."""
+    for path, cond in (query or {}).items():
+        value, present = _get_path(doc, path)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$exists":
+                    ok = present == bool(arg)
+                elif op == "$in":
+                    ok = value in arg
+                elif op == "$nin":
+                    ok = value not in arg
+                elif op == "$ne":
+                    ok = value != arg
+                elif value is None:
+                    ok = False
+                elif op == "$gt":
+                    ok = value > arg
+                elif op == "$gte":
+                    ok = value >= arg
+                elif op == "$lt":
+                    ok = value < arg
+                elif op == "$lte":
+                    ok = value <= arg
+                else:
+                    raise ValueError(f"Unsupported query operator {op}")
+                if not ok:
+                    return False
+        elif isinstance(value, list) and not isinstance(cond, list):
+            if cond not in value:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+def project_fields(doc, fields):
+    """Return "_id" plus the given (possibly dotted) fields of a document."""
+    if fields is None:
+        return doc
+    result = {"_id": doc["_id"]}
+    for field in fields:
+        value, present = _get_path(doc, field)
+        if present:
+            parent, key = _parent(result, field)
+            parent[key] = value
+    return result
+
+def _task_sort_key(task):
+    task_id = task.get("id")
+    if isinstance(task_id, (int, float)) and not isinstance(task_id, bool):
+        return (0, task_id, "")
+    return (1, 0, str(task_id))
+
+
+# ---------------- MongoDB ---------------- #
+
+class MongoBackend(StorageBackend):
+    """Stores projects and tasks in MongoDB. The client connects on first use."""
+
+    def __init__(self, uri, db_name, projects_collection="memory", tasks_collection="tasks",
+                 events_collection="memory_events", snapshots_collection="memory_snapshots",
+                 archive_collection="memory_archive", counters_collection="counters",
+                 max_pool_size=50, min_pool_size=0, default_project_id=None):
+        self.uri = uri
+        self.db_name = db_name
+        self.projects_collection_name = projects_collection
+        self.tasks_collection_name = tasks_collection
+        self.events_collection_name = events_collection
+        self.snapshots_collection_name = snapshots_collection
+        self.archive_collection_name = archive_collection
+        self.counters_collection_name = counters_collection
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.default_project_id = default_project_id
+        self._client = None
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+
+    @property
+    def db(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if MongoClient is None:
+                        raise RuntimeError("pymongo is required for the mongo storage backend")
+                    self._client = MongoClient(
+                        self.uri,
+                        maxPoolSize=self.max_pool_size,
+                        minPoolSize=self.min_pool_size
+                    )
+        return self._client[self.db_name]
+
+    @property
+    def projects(self):
+        return self.db[self.projects_collection_name]
+
+    @property
+    def tasks(self):
+        return self.db[self.tasks_collection_name]
+
+    @property
+    def events(self):
+        return self.db[self.events_collection_name]
+
+    @property
+    def snapshots(self):
+        return self.db[self.snapshots_collection_name]
+
+    @property
+    def archive(self):
+        return self.db[self.archive_collection_name]
+
+    @property
+    def counters(self):
+        return self.db[self.counters_collection_name]
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        if self.default_project_id is not None:
+            # Tasks stored before projects were partitioned belong to the default project
+            self.tasks.update_many({"project_id": {"$exists": False}}, {"$set": {"project_id": self.default_project_id}})
+        if "id_1" in self.tasks.index_information():
+            self.tasks.drop_index("id_1")
+        self.tasks.create_index([("project_id", ASCENDING), ("id", ASCENDING)], unique=True)
+        self.tasks.create_index([("project_id", ASCENDING), ("assignee", ASCENDING)])
+        self.tasks.create_index([("project_id", ASCENDING), ("status", ASCENDING)])
+        self.tasks.create_index([("project_id", ASCENDING), ("deadline", ASCENDING)])
+        self.tasks.create_index([("project_id", ASCENDING), ("deadline_date", ASCENDING)])
+        self.events.create_index([("project_id", ASCENDING), ("version", ASCENDING)], unique=True)
+        self.events.create_index([("project_id", ASCENDING), ("at", ASCENDING)])
+        self.snapshots.create_index([("project_id", ASCENDING), ("version", ASCENDING)], unique=True)
+        self.archive.create_index([("project_id", ASCENDING), ("kind", ASCENDING), ("key", ASCENDING)], unique=True)
+        self.archive.create_index([("project_id", ASCENDING), ("kind", ASCENDING), ("archived_at", DESCENDING)])
+        self._indexes_ready = True
+
+    def find_project(self, project_id, fields=None):
+        projection = None if fields is None else {field: 1 for field in fields}
+        return self.projects.find_one({"_id": project_id}, projection)
+
+    def insert_project(self, doc):
+        try:
+            self.projects.insert_one(doc)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def update_project(self, project_id, update, expected_version=None):
+        query = {"_id": project_id}
+        if expected_version is not None:
+            query["version"] = expected_version
+        return self.projects.update_one(query, update).matched_count > 0
+
+    def replace_project(self, project_id, doc, expected_version=None):
+        query = {"_id": project_id}
+        if expected_version is not None:
+            query["version"] = expected_version
+        return self.projects.replace_one(query, doc).matched_count > 0
+
+    def increment_version(self, project_id, update=None):
+        update = dict(update or {}, **{"$inc": {"version": 1}})
+        doc = self.projects.find_one_and_update(
+            {"_id": project_id},
+            update,
+            projection={"version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["version"] if doc else None
+
+    def list_projects(self):
+        return list(self.projects.find({}, {"project_name": 1}))
+
+    def find_tasks(self, project_id, query=None):
+        query = dict(query or {}, project_id=project_id)
+        return list(self.tasks.find(query, {"_id": 0, "project_id": 0}).sort("id", ASCENDING))
+
+    def find_task(self, project_id, task_id):
+        return self.tasks.find_one({"project_id": project_id, "id": task_id}, {"_id": 0, "project_id": 0})
+
+    def insert_task(self, project_id, task):
+        try:
+            self.tasks.insert_one(dict(task, project_id=project_id))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def update_task(self, project_id, task_id, update):
+        return self.tasks.update_one({"project_id": project_id, "id": task_id}, update).matched_count > 0
+
+    def delete_task(self, project_id, task_id):
+        return self.tasks.delete_one({"project_id": project_id, "id": task_id}).deleted_count
+
+    def apply_task_ops(self, project_id, ops):
+        requests = []
+        for op in ops:
+            key = {"project_id": project_id, "id": op[1]}
+            if op[0] == "upsert":
+                requests.append(UpdateOne(key, {"$set": op[2]}, upsert=True))
+            elif op[0] == "update":
+                requests.append(UpdateOne(key, op[2]))
+            elif op[0] == "delete":
+                requests.append(DeleteOne(key))
+        if requests:
+            self.tasks.bulk_write(requests, ordered=False)
+
+    def count_tasks(self, project_id):
+        return self.tasks.count_documents({"project_id": project_id})
+
+    def watch_projects(self):
+        stream = self.projects.watch()
+        return (change.get("documentKey", {}).get("_id") for change in stream)
+
+    def append_event(self, event):
+        self.events.insert_one(dict(event))
+
+    def find_events(self, project_id, after_version=None, up_to_version=None, until=None):
+        query = {"project_id": project_id}
+        version_range = {}
+        if after_version is not None:
+            version_range["$gt"] = after_version
+        if up_to_version is not None:
+            version_range["$lte"] = up_to_version
+        if version_range:
+            query["version"] = version_range
+        if until is not None:
+            query["at"] = {"$lte": until}
+        return list(self.events.find(query, {"_id": 0}).sort("version", ASCENDING))
+
+    def insert_snapshot(self, snapshot):
+        self.snapshots.replace_one(
+            {"project_id": snapshot["project_id"], "version": snapshot["version"]},
+            snapshot,
+            upsert=True
+        )
+
+    def find_snapshot(self, project_id, max_version=None, until=None):
+        query = {"project_id": project_id}
+        if max_version is not None:
+            query["version"] = {"$lte": max_version}
+        if until is not None:
+            query["at"] = {"$lte": until}
+        return self.snapshots.find_one(query, {"_id": 0}, sort=[("version", DESCENDING)])
+
+    def archive_items(self, project_id, entries):
+        requests = [
+            UpdateOne(
+                {"project_id": project_id, "kind": entry["kind"], "key": entry["key"]},
+                {"$setOnInsert": dict(entry, project_id=project_id)},
+                upsert=True
+            )
+            for entry in entries
+        ]
+        if requests:
+            self.archive.bulk_write(requests, ordered=False)
+
+    def find_archived(self, project_id, kind, query=None, limit=100, skip=0):
+        filters = {"project_id": project_id, "kind": kind}
+        filters.update({f"item.{k}": v for k, v in (query or {}).items()})
+        cursor = self.archive.find(filters, {"_id": 0}).sort("archived_at", DESCENDING).skip(skip).limit(limit)
+        return list(cursor)
+
+    def next_sequence(self, name, count=1, floor=0):
+        if floor:
+            self.counters.update_one({"_id": name}, {"$max": {"seq": floor}}, upsert=True)
+        doc = self.counters.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["seq"] - count + 1
+
+    def max_task_id(self):
+        numeric = {"$type": "number"}
+        task = self.tasks.find_one({"id": numeric}, {"id": 1}, sort=[("id", DESCENDING)])
+        archived = self.archive.find_one({"kind": "task", "item.id": numeric}, {"item.id": 1}, sort=[("item.id", DESCENDING)])
+        ids = [task["id"]] if task else []
+        if archived:
+            ids.append(archived["item"]["id"])
+        return max(ids) if ids else None
+
+
+# ---------------- SQLite (file or in-memory) ---------------- #
+
+class SQLiteBackend(StorageBackend):
+    """Embedded backend storing JSON documents in SQLite.
+
+    Use path=":memory:" for a throwaway in-process store (tests, benchmarks).
+    Each document is stored as JSON; task columns used for lookups are
+    duplicated into indexed columns.
+    """
+
+    def __init__(self, path="ai_pm.db"):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    self._create_schema(conn)
+                    self._conn = conn
+        return self._conn
+
+    def _create_schema(self, conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS projects (
+                project_id TEXT PRIMARY KEY,
+                version INTEGER,
+                doc TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                project_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                assignee TEXT,
+                status TEXT,
+                deadline TEXT,
+                deadline_date TEXT,
+                doc TEXT NOT NULL,
+                PRIMARY KEY (project_id, task_id)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_assignee ON tasks (project_id, assignee);
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (project_id, status);
+            CREATE INDEX IF NOT EXISTS tasks_deadline ON tasks (project_id, deadline);
+            CREATE TABLE IF NOT EXISTS events (
+                project_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                at TEXT NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (project_id, version)
+            );
+            CREATE INDEX IF NOT EXISTS events_at ON events (project_id, at);
+            CREATE TABLE IF NOT EXISTS snapshots (
+                project_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                at TEXT NOT NULL,
+                snapshot TEXT NOT NULL,
+                PRIMARY KEY (project_id, version)
+            );
+            CREATE TABLE IF NOT EXISTS archive (
+                project_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                archived_at TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                PRIMARY KEY (project_id, kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS archive_recent ON archive (project_id, kind, archived_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            );
+        """)
+        # Databases created before deadline_date was indexed
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
+        if "deadline_date" not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN deadline_date TEXT")
+            conn.execute("UPDATE tasks SET deadline_date = json_extract(doc, '$.deadline_date')")
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_deadline_date ON tasks (project_id, deadline_date)")
+        conn.commit()
+
+    @contextmanager
+    def _write_transaction(self):
+        # BEGIN IMMEDIATE takes the database write lock before the read half of a
+        # read-modify-write, so other connections to the same file (other
+        # processes) cannot interleave between the check and the write
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            yield
+
+    @staticmethod
+    def _dumps(doc):
+        return json.dumps(doc, default=str)
+
+    @staticmethod
+    def _task_key(task_id):
+        return json.dumps(task_id)
+
+    def _write_task(self, project_id, task, replace=True):
+        self.conn.execute(
+            ("INSERT OR REPLACE" if replace else "INSERT") + " INTO tasks (project_id, task_id, assignee, status, deadline, deadline_date, doc) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (project_id, self._task_key(task["id"]), task.get("assignee"), task.get("status"),
+             task.get("deadline"), task.get("deadline_date"), self._dumps(task))
+        )
+
+    def _read_task(self, project_id, task_id):
+        row = self.conn.execute(
+            "SELECT doc FROM tasks WHERE project_id = ? AND task_id = ?",
+            (project_id, self._task_key(task_id))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_project(self, project_id, fields=None):
+        with self._lock:
+            row = self.conn.execute("SELECT doc FROM projects WHERE project_id = ?", (project_id,)).fetchone()
+        if row is None:
+            return None
+        return project_fields(json.loads(row[0]), fields)
+
+    def insert_project(self, doc):
+        with self._lock, self.conn:
+            try:
+                self.conn.execute(
+                    "INSERT INTO projects (project_id, version, doc) VALUES (?, ?, ?)",
+                    (doc["_id"], doc.get("version"), self._dumps(doc))
+                )
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def _write_project(self, doc, current_version):
+        cursor = self.conn.execute(
+            "UPDATE projects SET version = ?, doc = ? WHERE project_id = ? AND version IS ?",
+            (doc.get("version"), self._dumps(doc), doc["_id"], current_version)
+        )
+        return cursor.rowcount == 1
+
+    def _current_project(self, project_id, expected_version):
+        doc = self.find_project(project_id)
+        if doc is None:
+            return None
+        if expected_version is not None and doc.get("version") != expected_version:
+            return None
+        return doc
+
+    def update_project(self, project_id, update, expected_version=None):
+        with self._write_transaction():
+            doc = self._current_project(project_id, expected_version)
+            if doc is None:
+                return False
+            current_version = doc.get("version")
+            return self._write_project(apply_update(doc, update), current_version)
+
+    def replace_project(self, project_id, doc, expected_version=None):
+        with self._write_transaction():
+            current = self._current_project(project_id, expected_version)
+            if current is None:
+                return False
+            return self._write_project(dict(doc, _id=project_id), current.get("version"))
+
+    def increment_version(self, project_id, update=None):
+        with self._write_transaction():
+            doc = self.find_project(project_id)
+            if doc is None:
+                return None
+            current_version = doc.get("version")
+            update = dict(update or {}, **{"$inc": {"version": 1}})
+            self._write_project(apply_update(doc, update), current_version)
+        return doc["version"]
+
+    def list_projects(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT doc FROM projects").fetchall()
+        return [project_fields(json.loads(row[0]), ["project_name"]) for row in rows]
+
+    def find_tasks(self, project_id, query=None):
+        query = dict(query or {})
+        sql = "SELECT doc FROM tasks WHERE project_id = ?"
+        params = [project_id]
+        # Push simple equality on indexed columns down to SQLite
+        for column in ("assignee", "status"):
+            if isinstance(query.get(column), str):
+                sql += f" AND {column} = ?"
+                params.append(query.pop(column))
+        # ...and date ranges on deadline_date (ISO strings compare in date order)
+        if isinstance(query.get("deadline_date"), dict):
+            for op, sql_op in (("$gt", ">"), ("$gte", ">="), ("$lt", "<"), ("$lte", "<=")):
+                if op in query["deadline_date"]:
+                    sql += f" AND deadline_date {sql_op} ?"
+                    params.append(query["deadline_date"][op])
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        tasks = [json.loads(row[0]) for row in rows]
+        return sorted((t for t in tasks if matches(t, query)), key=_task_sort_key)
+
+    def find_task(self, project_id, task_id):
+        with self._lock:
+            return self._read_task(project_id, task_id)
+
+    def insert_task(self, project_id, task):
+        with self._lock, self.conn:
+            try:
+                self._write_task(project_id, dict(task), replace=False)
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def update_task(self, project_id, task_id, update):
+        with self._write_transaction():
+            task = self._read_task(project_id, task_id)
+            if task is None:
+                return False
+            self._write_task(project_id, apply_update(task, update))
+        return True
+
+    def delete_task(self, project_id, task_id):
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM tasks WHERE project_id = ? AND task_id = ?",
+                (project_id, self._task_key(task_id))
+            )
+        return cursor.rowcount
+
+    def apply_task_ops(self, project_id, ops):
+        with self._write_transaction():
+            for op in ops:
+                if op[0] == "delete":
+                    self.conn.execute(
+                        "DELETE FROM tasks WHERE project_id = ? AND task_id = ?",
+                        (project_id, self._task_key(op[1]))
+                    )
+                    continue
+                task = self._read_task(project_id, op[1])
+                if op[0] == "upsert":
+                    task = dict(task or {"id": op[1]}, **op[2])
+                elif task is None:
+                    continue
+                else:
+                    task = apply_update(task, op[2])
+                self._write_task(project_id, task)
+
+    def count_tasks(self, project_id):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tasks WHERE project_id = ?", (project_id,)).fetchone()[0]
+
+    def append_event(self, event):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO events (project_id, version, at, event) VALUES (?, ?, ?, ?)",
+                (event["project_id"], event["version"], event["at"], self._dumps(event))
+            )
+
+    def find_events(self, project_id, after_version=None, up_to_version=None, until=None):
+        sql = "SELECT event FROM events WHERE project_id = ?"
+        params = [project_id]
+        if after_version is not None:
+            sql += " AND version > ?"
+            params.append(after_version)
+        if up_to_version is not None:
+            sql += " AND version <= ?"
+            params.append(up_to_version)
+        if until is not None:
+            sql += " AND at <= ?"
+            params.append(until)
+        with self._lock:
+            rows = self.conn.execute(sql + " ORDER BY version", params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def insert_snapshot(self, snapshot):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots (project_id, version, at, snapshot) VALUES (?, ?, ?, ?)",
+                (snapshot["project_id"], snapshot["version"], snapshot["at"], self._dumps(snapshot))
+            )
+
+    def find_snapshot(self, project_id, max_version=None, until=None):
+        sql = "SELECT snapshot FROM snapshots WHERE project_id = ?"
+        params = [project_id]
+        if max_version is not None:
+            sql += " AND version <= ?"
+            params.append(max_version)
+        if until is not None:
+            sql += " AND at <= ?"
+            params.append(until)
+        with self._lock:
+            row = self.conn.execute(sql + " ORDER BY version DESC LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def archive_items(self, project_id, entries):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO archive (project_id, kind, key, archived_at, entry) VALUES (?, ?, ?, ?, ?)",
+                [(project_id, e["kind"], e["key"], e["archived_at"], self._dumps(dict(e, project_id=project_id)))
+                 for e in entries]
+            )
+
+    def find_archived(self, project_id, kind, query=None, limit=100, skip=0):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT entry FROM archive WHERE project_id = ? AND kind = ? ORDER BY archived_at DESC",
+                (project_id, kind)
+            ).fetchall()
+        entries = [json.loads(row[0]) for row in rows]
+        entries = [e for e in entries if matches(e["item"], query)]
+        return entries[skip:skip + limit]
+
+    def next_sequence(self, name, count=1, floor=0):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO counters (name, seq) VALUES (?, 0)", (name,))
+            self.conn.execute("UPDATE counters SET seq = MAX(seq, ?) + ? WHERE name = ?", (floor, count, name))
+            seq = self.conn.execute("SELECT seq FROM counters WHERE name = ?", (name,)).fetchone()[0]
+        return seq - count + 1
+
+    def max_task_id(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT MAX(json_extract(doc, '$.id')) FROM tasks WHERE json_type(doc, '$.id') = 'integer' "
+                "UNION ALL SELECT MAX(json_extract(entry, '$.item.id')) FROM archive "
+                "WHERE kind = 'task' AND json_type(entry, '$.item.id') = 'integer'"
+            ).fetchall()
+        ids = [row[0] for row in rows if row[0] is not None]
+        return max(ids) if ids else None
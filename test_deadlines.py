@@ -0,0 +1,57 @@
+import pytest
+
+from deadlines import normalize_deadlines, resolve_deadline, valid_meeting_date
+
+# Wednesday
+MEETING = "2024-03-06"
+
+@pytest.mark.parametrize("text, expected", [
+    ("today", "2024-03-06"),
+    ("by EOD", "2024-03-06"),
+    ("tomorrow", "2024-03-07"),
+    ("day after tomorrow", "2024-03-08"),
+    ("in 3 days", "2024-03-09"),
+    ("in two weeks", "2024-03-20"),
+    ("in a month", "2024-04-06"),
+    ("end of week", "2024-03-08"),
+    ("by next week", "2024-03-15"),
+    ("end of month", "2024-03-31"),
+    ("next month", "2024-04-30"),
+    ("Thursday", "2024-03-07"),
+    ("Wednesday", "2024-03-13"),
+    ("next Monday", "2024-03-11"),
+    ("March 20th", "2024-03-20"),
+    ("20 of March", "2024-03-20"),
+    ("Jan 10, 2025", "2025-01-10"),
+    ("2024-04-01", "2024-04-01"),
+])
+def test_relative_and_absolute_forms(text, expected):
+    assert resolve_deadline(text, MEETING) == expected
+
+def test_past_month_day_rolls_over_to_next_year():
+    assert resolve_deadline("March 5", MEETING) == "2025-03-05"
+    assert resolve_deadline("Jan 10", "2024-12-20") == "2025-01-10"
+
+def test_rollover_across_year_and_month_end():
+    assert resolve_deadline("next month", "2024-12-10") == "2025-01-31"
+    assert resolve_deadline("in one month", "2024-01-31") == "2024-02-29"
+
+def test_feb_29_without_next_year_counterpart():
+    assert resolve_deadline("Feb 29", "2024-02-01") == "2024-02-29"
+    assert resolve_deadline("Feb 29", "2024-03-01") is None
+
+@pytest.mark.parametrize("text", [None, "", "soon", "2024-02-30", "in 99999999 days"])
+def test_unresolvable(text):
+    assert resolve_deadline(text, MEETING) is None
+
+def test_malformed_meeting_date():
+    assert resolve_deadline("Thursday", "not-a-date") is None
+    assert not valid_meeting_date("06/03/2024")
+    assert valid_meeting_date(MEETING) and valid_meeting_date(None)
+
+def test_normalize_deadlines():
+    tasks = normalize_deadlines([{"deadline": "tomorrow"}, {"deadline": None}], MEETING)
+    assert tasks == [
+        {"deadline": "tomorrow", "meeting_date": MEETING, "deadline_date": "2024-03-07"},
+        {"deadline": None, "meeting_date": MEETING, "deadline_date": None},
+    ]
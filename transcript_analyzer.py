@@ -1,9 +1,17 @@
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
-import json
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+import asyncio
 import csv
 import os
-from memory_manager import load_memory, save_memory
+import re
+import time
+from relevance import select_relevant
+from llm_metrics import invoke_llm, ainvoke_llm, stream_llm, astream_llm, record_skip
+from preextract import split_speaker_turns, analyze_transcript
+from json_stream import extract_json, ArrayObjectParser
+from memory_manager import load_memory, aload_memory, update_memory, aupdate_memory, PROJECT_ID
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -13,8 +21,151 @@ llm = ChatGroq(
     api_key=GROQ_API_KEY
 )
 
-def merge_memory_with_transcript(transcript):
-    memory = load_memory()
+# Transcripts longer than CHUNK_MAX_CHARS are split on speaker turns and extracted
+# chunk by chunk (map), then merged and deduplicated (reduce). Consecutive chunks
+# share CHUNK_OVERLAP_TURNS turns so a task spread over a boundary is not lost.
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "6000"))
+CHUNK_OVERLAP_TURNS = int(os.getenv("CHUNK_OVERLAP_TURNS", "2"))
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", "4"))
+TASK_DUPLICATE_SIMILARITY = 0.85
+
+# Only the existing tasks / team members most relevant to the transcript go into
+# the prompt, ranked with a local BM25 index and capped by an approximate token budget.
+CONTEXT_TOP_K_TASKS = int(os.getenv("CONTEXT_TOP_K_TASKS", "20"))
+CONTEXT_TOP_K_TEAM = int(os.getenv("CONTEXT_TOP_K_TEAM", "25"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# The local pre-extractor (preextract.py) decides whether the metadata prompt is
+# needed and trims the task prompt to the turns around candidate action items (the
+# task prompt itself always runs); PREEXTRACT_ENABLED=0 always sends everything.
+PREEXTRACT_ENABLED = os.getenv("PREEXTRACT_ENABLED", "1") == "1"
+
+
+def metadata_chunks(memory, transcript):
+    """Chunks for the metadata prompt; none when the pre-extractor finds nothing new to record."""
+    if PREEXTRACT_ENABLED and not analyze_transcript(transcript, memory)["needs_metadata"]:
+        record_skip("extract_metadata")
+        return []
+    return chunk_transcript(transcript)
+
+
+def task_chunks(memory, transcript):
+    """Chunks for the task prompt, cut down to the turns around candidate action items."""
+    if PREEXTRACT_ENABLED:
+        transcript = analyze_transcript(transcript, memory)["task_text"]
+    return chunk_transcript(transcript)
+
+
+def chunk_transcript(transcript, max_chars=None, overlap_turns=None):
+    """Pack speaker turns into chunks of at most max_chars, overlapping by overlap_turns."""
+    max_chars = max_chars or CHUNK_MAX_CHARS
+    overlap_turns = CHUNK_OVERLAP_TURNS if overlap_turns is None else overlap_turns
+    if len(transcript) <= max_chars:
+        return [transcript]
+
+    turns = []
+    for turn in split_speaker_turns(transcript):
+        # A single monologue longer than a chunk is cut into pieces
+        turns.extend(turn[i:i + max_chars] for i in range(0, len(turn), max_chars))
+
+    chunks, current, size, fresh = [], [], 0, 0
+    for turn in turns:
+        if current and size + len(turn) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current = current[-overlap_turns:] if overlap_turns else []
+            size = sum(len(t) + 1 for t in current)
+            # Drop overlap that would not leave room for the next turn
+            while current and size + len(turn) + 1 > max_chars:
+                size -= len(current.pop(0)) + 1
+            fresh = 0
+        current.append(turn)
+        size += len(turn) + 1
+        fresh += 1
+    if fresh:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _normalize_task_text(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text or "").lower()).split())
+
+
+def _find_duplicate(tasks, task):
+    text = _normalize_task_text(task.get("task"))
+    assignee = _normalize_task_text(task.get("assignee"))
+    for kept in tasks:
+        if _normalize_task_text(kept.get("assignee")) != assignee:
+            continue
+        if SequenceMatcher(None, _normalize_task_text(kept.get("task")), text).ratio() >= TASK_DUPLICATE_SIMILARITY:
+            return kept
+    return None
+
+
+def _merge_duplicate(kept, task):
+    for key, value in task.items():
+        if value and not kept.get(key):
+            kept[key] = value
+    if task.get("status") == "Done":
+        kept["status"] = "Done"
+
+
+def reduce_chunk_tasks(chunk_tasks):
+    """Merge per-chunk task lists, dropping tasks repeated across chunks, and renumber IDs.
+
+    Two tasks are duplicates when they have the same assignee and near-identical
+    descriptions; the first occurrence is kept and its empty fields are filled from
+    the later one. A later "Done" status wins, since the chunk that reports
+    completion comes after the one that assigned the task.
+    """
+    merged = []
+    for tasks in chunk_tasks:
+        for task in tasks:
+            kept = _find_duplicate(merged, task)
+            if kept is None:
+                merged.append(dict(task))
+            else:
+                _merge_duplicate(kept, task)
+
+    ids = [t["id"] for tasks in chunk_tasks[:1] for t in tasks if isinstance(t.get("id"), int)]
+    first_id = min(ids) if ids else 1001
+    for offset, task in enumerate(merged):
+        task["id"] = first_id + offset
+    return merged
+
+
+def reduce_chunk_metadata(chunk_metadata):
+    """Merge per-chunk metadata updates; later chunks win for the title and description."""
+    merged = {"project_name": "", "project_info": {"description": "", "notes": []}, "team_add": [], "team_remove": []}
+    for metadata in chunk_metadata:
+        if metadata.get("project_name"):
+            merged["project_name"] = metadata["project_name"]
+        info = metadata.get("project_info", {})
+        if info.get("description"):
+            merged["project_info"]["description"] = info["description"]
+        for note in info.get("notes") or []:
+            if note and note not in merged["project_info"]["notes"]:
+                merged["project_info"]["notes"].append(note)
+        for key in ("team_add", "team_remove"):
+            for member in metadata.get(key) or []:
+                if member and member not in merged[key]:
+                    merged[key].append(member)
+    return merged
+
+
+def merge_memory_with_transcript(transcript, project_id=PROJECT_ID):
+    memory = load_memory(project_id)
+    return memory, build_context(memory, transcript)
+
+
+def _task_terms(t):
+    return " ".join(str(t.get(k) or "") for k in ("task", "assignee", "giver", "deliverable"))
+
+
+def _render_task(t):
+    return f"{t.get('id','')} - {t.get('task','')} (Giver: {t.get('giver','')}, Assignee: {t.get('assignee','')}, Deadline: {t.get('deadline','')}, Priority: {t.get('priority','')}, Status: {t.get('status','')}, Deliverable: {t.get('deliverable','')})"
+
+
+def build_context(memory, transcript):
     context_text = ""
 
     if memory.get("project_name") or memory.get("project_info", {}).get("description"):
@@ -22,23 +173,26 @@ def merge_memory_with_transcript(transcript):
         context_text += f"Title: {memory.get('project_name','')}\n"
         context_text += f"Description: {memory.get('project_info',{}).get('description','')}\n\n"
 
-    if memory.get("tasks"):
+    tasks = select_relevant(memory.get("tasks", []), _task_terms, transcript, CONTEXT_TOP_K_TASKS, CONTEXT_TOKEN_BUDGET, _render_task)
+    if tasks:
         context_text += "Existing tasks:\n"
-        for t in memory["tasks"]:
-            context_text += f"{t.get('id','')} - {t.get('task','')} (Giver: {t.get('giver','')}, Assignee: {t.get('assignee','')}, Deadline: {t.get('deadline','')}, Priority: {t.get('priority','')}, Status: {t.get('status','')}, Deliverable: {t.get('deliverable','')})\n"
+        for t in tasks:
+            context_text += _render_task(t) + "\n"
 
-    if memory.get("team"):
+    team = memory.get("team", [])
+    if len(team) > CONTEXT_TOP_K_TEAM:
+        team = select_relevant(team, str, transcript, CONTEXT_TOP_K_TEAM, CONTEXT_TOKEN_BUDGET)
+    if team:
         context_text += "Team members:\n"
-        for member in memory["team"]:
+        for member in team:
             context_text += f"- {member}\n"
 
     context_text += "\nCurrent Meeting Transcript:\n" + transcript
-    return memory, context_text
+    return context_text
 
 
-def extract_metadata_from_transcript(transcript):
-    memory, _ = merge_memory_with_transcript(transcript)
-    prompt = f"""
+def build_metadata_prompt(memory, transcript):
+    return f"""
             You are an AI Project Manager Assistant.
             From the transcript below, extract updates for:
             - Project title (only if explicitly mentioned)
@@ -74,9 +228,37 @@ def extract_metadata_from_transcript(transcript):
             Please give ONLY the JSON, properly formatted, no extra spaces or characters.
             """
 
-    response = llm.invoke(prompt)
-    metadata_updates = json.loads(response.content)
 
+def extract_metadata_updates(memory, transcript):
+    """Ask the LLM for the metadata updates in a transcript without touching memory."""
+    chunks = metadata_chunks(memory, transcript)
+    queued_at = time.perf_counter()
+
+    def extract(chunk):
+        return invoke_llm(llm, build_metadata_prompt(memory, chunk), "extract_metadata", extract_json, queued_at)
+
+    if not chunks:
+        return {}
+    if len(chunks) == 1:
+        return extract(chunks[0])
+    with ThreadPoolExecutor(max_workers=CHUNK_CONCURRENCY) as pool:
+        return reduce_chunk_metadata(list(pool.map(extract, chunks)))
+
+
+def extract_metadata_from_transcript(transcript, project_id=PROJECT_ID):
+    memory = load_memory(project_id)
+    metadata_updates = extract_metadata_updates(memory, transcript)
+
+    # Re-applied on a fresh copy if another request saved memory in the meantime
+    def apply(memory):
+        apply_metadata_updates(memory, metadata_updates)
+        return memory
+
+    memory = update_memory(apply, project_id)
+    return memory, metadata_updates
+
+
+def apply_metadata_updates(memory, metadata_updates):
     if metadata_updates.get("project_name"):
         memory["project_name"] = metadata_updates["project_name"]
 
@@ -95,14 +277,10 @@ def extract_metadata_from_transcript(transcript):
         memory["team"] = [m for m in memory["team"] if m not in metadata_updates["team_remove"]]
 
     memory["metadata"]["meeting_count"] += 1
-    save_memory(memory)
-    return memory, metadata_updates
 
 
-def extract_tasks_from_transcript(transcript):
-    memory, prompt_text = merge_memory_with_transcript(transcript)
-
-    prompt = f"""
+def build_tasks_prompt(memory, prompt_text):
+    return f"""
         You are an AI Project Manager Assistant.
         Extract all tasks discussed in the meeting transcript below.
 
@@ -133,18 +311,212 @@ def extract_tasks_from_transcript(transcript):
         """
 
 
-    response = llm.invoke(prompt)
-    tasks = json.loads(response.content)
-    return tasks
+def extract_tasks_from_transcript(transcript, project_id=PROJECT_ID):
+    memory = load_memory(project_id)
+    chunks = task_chunks(memory, transcript)
+    queued_at = time.perf_counter()
+
+    def extract(chunk):
+        return invoke_llm(llm, build_tasks_prompt(memory, build_context(memory, chunk)), "extract_tasks", extract_json, queued_at)
+
+    if len(chunks) == 1:
+        return extract(chunks[0])
+    with ThreadPoolExecutor(max_workers=CHUNK_CONCURRENCY) as pool:
+        return reduce_chunk_tasks(list(pool.map(extract, chunks)))
+
+
+async def aextract_from_transcript(transcript, project_id=PROJECT_ID):
+    """Run the metadata and task prompts concurrently against one memory snapshot.
+
+    Both prompts are built from the same loaded memory, sent with ainvoke at the
+    same time, and the metadata merge is applied once both have returned. Long
+    transcripts are chunked and every chunk's prompts run concurrently as well,
+    at most CHUNK_CONCURRENCY LLM calls at a time.
+    """
+    memory = await aload_memory(project_id)
+    meta_chunks = metadata_chunks(memory, transcript)
+    tasks_chunks = task_chunks(memory, transcript)
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def invoke(prompt, site):
+        queued_at = time.perf_counter()
+        async with semaphore:
+            return await ainvoke_llm(llm, prompt, site, extract_json, queued_at)
+
+    results = await asyncio.gather(
+        *(invoke(build_metadata_prompt(memory, chunk), "extract_metadata") for chunk in meta_chunks),
+        *(invoke(build_tasks_prompt(memory, build_context(memory, chunk)), "extract_tasks") for chunk in tasks_chunks)
+    )
+    metadata_results, task_results = results[:len(meta_chunks)], results[len(meta_chunks):]
+    if len(metadata_results) > 1:
+        metadata_updates = reduce_chunk_metadata(metadata_results)
+    else:
+        metadata_updates = metadata_results[0] if metadata_results else {}
+    tasks = task_results[0] if len(task_results) == 1 else reduce_chunk_tasks(task_results)
+
+    def apply(memory):
+        apply_metadata_updates(memory, metadata_updates)
+        return memory
+
+    memory = await aupdate_memory(apply, project_id)
+    return memory, metadata_updates, tasks
+
+
+async def aextract_metadata_from_transcript(transcript, project_id=PROJECT_ID):
+    """Metadata-only async extraction, used alongside the streamed task extraction."""
+    memory = await aload_memory(project_id)
+    chunks = metadata_chunks(memory, transcript)
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def invoke(chunk):
+        queued_at = time.perf_counter()
+        async with semaphore:
+            return await ainvoke_llm(llm, build_metadata_prompt(memory, chunk), "extract_metadata", extract_json, queued_at)
+
+    results = await asyncio.gather(*(invoke(chunk) for chunk in chunks))
+    if len(results) > 1:
+        metadata_updates = reduce_chunk_metadata(results)
+    else:
+        metadata_updates = results[0] if results else {}
+
+    def apply(memory):
+        apply_metadata_updates(memory, metadata_updates)
+        return memory
+
+    memory = await aupdate_memory(apply, project_id)
+    return memory, metadata_updates
+
+
+def _collect_streamed_task(tasks, task):
+    """Dedupe and number a streamed task; returns it if new, None if it merged into an earlier one."""
+    kept = _find_duplicate(tasks, task)
+    if kept is not None:
+        _merge_duplicate(kept, task)
+        return None
+    task = dict(task)
+    first_id = tasks[0]["id"] if tasks else (task["id"] if isinstance(task.get("id"), int) else 1001)
+    task["id"] = first_id + len(tasks)
+    tasks.append(task)
+    return task
+
+
+def stream_tasks_from_transcript(transcript, project_id=PROJECT_ID):
+    """Yield each extracted task as soon as the LLM has finished writing it.
+
+    Chunks of a long transcript are streamed one after another; tasks repeated in
+    a later chunk are merged into the earlier one instead of being yielded again.
+    """
+    memory = load_memory(project_id)
+    tasks = []
+    for chunk in task_chunks(memory, transcript):
+        parser = ArrayObjectParser()
+        for piece in stream_llm(llm, build_tasks_prompt(memory, build_context(memory, chunk)), "extract_tasks"):
+            for task in parser.feed(piece):
+                task = _collect_streamed_task(tasks, task)
+                if task is not None:
+                    yield task
+
+
+async def astream_tasks_from_transcript(transcript, project_id=PROJECT_ID):
+    """Async counterpart of stream_tasks_from_transcript, using llm.astream."""
+    memory = await aload_memory(project_id)
+    tasks = []
+    for chunk in task_chunks(memory, transcript):
+        parser = ArrayObjectParser()
+        async for piece in astream_llm(llm, build_tasks_prompt(memory, build_context(memory, chunk)), "extract_tasks"):
+            for task in parser.feed(piece):
+                task = _collect_streamed_task(tasks, task)
+                if task is not None:
+                    yield task
+
+
+def extract_all_from_transcript(transcript, project_id=PROJECT_ID):
+    """Single LLM call returning both the metadata updates and the task list.
+
+    A transcript too long for one prompt falls back to the separate prompts,
+    which chunk it.
+    """
+    if len(chunk_transcript(transcript)) > 1:
+        memory, metadata_updates = extract_metadata_from_transcript(transcript, project_id)
+        return memory, metadata_updates, extract_tasks_from_transcript(transcript, project_id)
+    memory, prompt_text = merge_memory_with_transcript(transcript, project_id)
+    prompt = f"""
+        You are an AI Project Manager Assistant.
+        From the meeting transcript below, extract BOTH the project metadata updates and all tasks discussed.
+
+        Metadata updates:
+        - Project title (only if explicitly mentioned)
+        - Project description (frame based on discussed tasks)
+        - Team members (use full names exactly as in past memory; do not add duplicates; get new members if they are not in the memory)
+        - Context notes (any other info not related to tasks)
+
+        Tasks, each an object with these keys:
+        - id (unique task number, starting from 1001, increment by 1 for each task)
+        - giver (who assigned the task; always use full names from existing memory)
+        - assignee (who will do the task; always use full names and map them according to then tasks similarity from existing memory)
+        - task (what needs to be done)
+        - deadline (if mentioned, else null)
+        - deliverable (what should be produced)
+        - priority (High / Medium / Low; infer from context)
+        - status (choose only from these: "In Progress", "Done")
+            Guidelines for status:
+            * "In Progress" → if assignee is expected to start/continue or has a deadline
+            * "Done" → if explicitly mentioned as finished
+
+        Important rules:
+        1. Always use full names as they appear in existing memory. Do NOT create shortened or partial names.
+        2. Only add new members to 'team_add' if they are not already in memory.
+        3. Only remove members if explicitly mentioned.
+        4. Map all names (giver and assignee) to their full names from the existing memory context.
+        5. If a first name appears that matches multiple team members, infer the correct one by **comparing the new task with their past similar tasks** (task domain similarity).
+        6. Detect any new team member introductions or role updates
+
+        Return JSON in this exact format:
+        {{
+            "metadata": {{
+                "project_name": "...",
+                "project_info": {{
+                    "description": "...",
+                    "notes": ["..."]
+                }},
+                "team_add": ["..."],
+                "team_remove": ["..."]
+            }},
+            "tasks": [ {{ "id": 1001, "giver": "...", "assignee": "...", "task": "...", "deadline": null, "deliverable": "...", "priority": "...", "status": "..." }} ]
+        }}
+
+        Meeting Transcript + Context:
+        {prompt_text}
+
+        Existing Team Members: {memory.get("team")}
+
+        Return ONLY valid JSON, properly formatted, no extra text or whitespace.
+        """
+
+    result = invoke_llm(llm, prompt, "extract_all", extract_json)
+    metadata_updates = result.get("metadata", {})
+    tasks = result.get("tasks", [])
+
+    def apply(memory):
+        apply_metadata_updates(memory, metadata_updates)
+        return memory
+
+    memory = update_memory(apply, project_id)
+    return memory, metadata_updates, tasks
+
+
+def approval_csv_path(project_id=PROJECT_ID):
+    """Per-project approval CSV, so projects never overwrite each other's export."""
+    return "approval_" + re.sub(r"[^\w-]", "_", project_id) + ".csv"
 
 
 def save_tasks_to_csv(tasks, filename="approval.csv"):
     if not tasks:
         print("No tasks discussed in meeting")
         return
-    keys = ["id", "giver", "assignee", "task", "deadline", "deliverable", "priority", "status"]
+    keys = ["id", "giver", "assignee", "task", "deadline", "deadline_date", "deliverable", "priority", "status"]
     with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
+        writer = csv.DictWriter(f, fieldnames=keys, extrasaction="ignore")
         writer.writeheader()
         writer.writerows(tasks)
 